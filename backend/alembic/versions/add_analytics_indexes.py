@@ -0,0 +1,56 @@
+"""add indexes for analytics and therapist dashboard queries
+
+Revision ID: add_analytics_indexes
+Revises: unify_chat_mode_enum
+Create Date: 2026-10-15 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_analytics_indexes'
+down_revision = 'unify_chat_mode_enum'
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_emotion_session_created', 'emotion_data', ['session_id', 'created_at'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Leading column of ix_emotion_session_created covers session_id lookups
+        op.drop_index(
+            'ix_emotion_data_session_id', table_name='emotion_data',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.create_index(
+            'ix_chat_escalations_triggered_at', 'chat_escalations', ['triggered_at'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_appt_created_status', 'appointments', ['created_at', 'status'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_appt_created_status', table_name='appointments',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index(
+            'ix_chat_escalations_triggered_at', table_name='chat_escalations',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.create_index(
+            'ix_emotion_data_session_id', 'emotion_data', ['session_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index(
+            'ix_emotion_session_created', table_name='emotion_data',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,48 @@
+"""add composite indexes for upcoming appointments and chat history
+
+Revision ID: add_hot_path_indexes
+Revises: add_chat_mode
+Create Date: 2026-10-15 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_path_indexes'
+down_revision = 'add_chat_mode'
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appt_status_start', 'appointments', ['status', 'start_time'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_chat_session_created', 'chat_messages', ['session_id', 'created_at'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Leading column of ix_chat_session_created covers session_id lookups
+        op.drop_index(
+            'ix_chat_messages_session_id', table_name='chat_messages',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_chat_messages_session_id', 'chat_messages', ['session_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index(
+            'ix_chat_session_created', table_name='chat_messages',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index(
+            'ix_appt_status_start', table_name='appointments',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,45 @@
+"""drop redundant indexes on primary key columns
+
+Revision ID: drop_redundant_pk_indexes
+Revises: add_hot_path_indexes
+Create Date: 2026-10-15 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'drop_redundant_pk_indexes'
+down_revision = 'add_hot_path_indexes'
+depends_on = None
+
+
+# Tables whose primary key also carried an ix_<table>_id index
+TABLES = [
+    'visitors',
+    'appointments',
+    'chat_messages',
+    'emotion_data',
+    'therapist_notes',
+    'chat_sessions',
+    'chat_escalations',
+]
+
+
+def upgrade():
+    # The primary key constraint already provides a unique B-tree on id
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index(
+                f'ix_{table}_id', table_name=table,
+                postgresql_concurrently=True, if_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_id', table, ['id'],
+                postgresql_concurrently=True, if_not_exists=True
+            )
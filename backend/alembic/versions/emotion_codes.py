@@ -0,0 +1,48 @@
+"""store emotion labels as smallint codes
+
+Revision ID: emotion_codes
+Revises: add_analytics_indexes
+Create Date: 2026-10-15 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'emotion_codes'
+down_revision = 'add_analytics_indexes'
+depends_on = None
+
+
+# Frozen copy of app.models.emotion.EmotionCode
+EMOTION_CODES = {
+    'neutral': 0,
+    'joy': 1,
+    'sadness': 2,
+    'anger': 3,
+    'fear': 4,
+    'surprise': 5,
+    'disgust': 6,
+    'anxiety': 7,
+}
+
+
+def _to_code(column, default):
+    whens = " ".join(f"WHEN '{label}' THEN {code}" for label, code in EMOTION_CODES.items())
+    return f"CASE lower({column}) {whens} ELSE {default} END"
+
+
+def _to_label(column):
+    whens = " ".join(f"WHEN {code} THEN '{label}'" for label, code in EMOTION_CODES.items())
+    return f"CASE {column} {whens} END"
+
+
+def upgrade():
+    # emotion_data.emotion is NOT NULL: an unknown label becomes neutral
+    op.execute(f"ALTER TABLE emotion_data ALTER COLUMN emotion TYPE smallint USING ({_to_code('emotion', 0)})")
+    op.execute(f"ALTER TABLE chat_messages ALTER COLUMN emotion TYPE smallint USING ({_to_code('emotion', 'NULL')})")
+
+
+def downgrade():
+    op.execute(f"ALTER TABLE chat_messages ALTER COLUMN emotion TYPE varchar USING ({_to_label('emotion')})")
+    op.execute(f"ALTER TABLE emotion_data ALTER COLUMN emotion TYPE varchar USING ({_to_label('emotion')})")
@@ -0,0 +1,43 @@
+"""store read receipts as boolean and escalation answers as enum
+
+Revision ID: native_flag_types
+Revises: drop_redundant_pk_indexes
+Create Date: 2026-10-15 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'native_flag_types'
+down_revision = 'drop_redundant_pk_indexes'
+depends_on = None
+
+
+escalation_response = sa.Enum('pending', 'accepted', 'declined', name='escalation_response')
+
+
+def upgrade():
+    # chat_messages.is_read: 'true'/'false' strings -> boolean
+    op.execute("ALTER TABLE chat_messages ALTER COLUMN is_read TYPE boolean USING (is_read = 'true')")
+    op.execute("UPDATE chat_messages SET is_read = false WHERE is_read IS NULL")
+    op.alter_column('chat_messages', 'is_read', nullable=False)
+
+    # chat_escalations.user_accepted: free-form string -> escalation_response enum
+    escalation_response.create(op.get_bind(), checkfirst=True)
+    op.execute("UPDATE chat_escalations SET user_accepted = 'pending' WHERE user_accepted IS NULL")
+    op.execute(
+        "ALTER TABLE chat_escalations ALTER COLUMN user_accepted "
+        "TYPE escalation_response USING user_accepted::escalation_response"
+    )
+    op.alter_column('chat_escalations', 'user_accepted', nullable=False)
+
+
+def downgrade():
+    op.execute("ALTER TABLE chat_escalations ALTER COLUMN user_accepted TYPE varchar USING user_accepted::text")
+    op.alter_column('chat_escalations', 'user_accepted', nullable=True)
+    escalation_response.drop(op.get_bind(), checkfirst=True)
+
+    op.execute("ALTER TABLE chat_messages ALTER COLUMN is_read TYPE varchar USING (CASE WHEN is_read THEN 'true' ELSE 'false' END)")
+    op.alter_column('chat_messages', 'is_read', nullable=True)
@@ -0,0 +1,52 @@
+"""store timestamps as timestamptz with server-side now() defaults
+
+Revision ID: timestamptz_server_defaults
+Revises: native_flag_types
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'timestamptz_server_defaults'
+down_revision = 'native_flag_types'
+depends_on = None
+
+
+# (table, column, has now() default)
+COLUMNS = [
+    ('visitors', 'created_at', True),
+    ('appointments', 'created_at', True),
+    ('appointments', 'updated_at', True),
+    ('chat_messages', 'created_at', True),
+    ('emotion_data', 'created_at', True),
+    ('therapist_notes', 'created_at', True),
+    ('therapist_notes', 'updated_at', True),
+    ('chat_sessions', 'created_at', True),
+    ('chat_sessions', 'updated_at', True),
+    ('chat_sessions', 'therapist_joined_at', False),
+    ('chat_escalations', 'triggered_at', True),
+    ('chat_escalations', 'resolved_at', False),
+]
+
+
+def upgrade():
+    # Existing naive values were written with datetime.utcnow()
+    for table, column, has_default in COLUMNS:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE timestamptz USING {column} AT TIME ZONE 'UTC'"
+        )
+        if has_default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT now()")
+
+
+def downgrade():
+    for table, column, has_default in COLUMNS:
+        if has_default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE timestamp USING {column} AT TIME ZONE 'UTC'"
+        )
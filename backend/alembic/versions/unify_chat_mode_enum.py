@@ -0,0 +1,25 @@
+"""store chat_sessions.mode with the shared chatmode enum
+
+Revision ID: unify_chat_mode_enum
+Revises: timestamptz_server_defaults
+Create Date: 2026-10-15 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'unify_chat_mode_enum'
+down_revision = 'timestamptz_server_defaults'
+depends_on = None
+
+
+def upgrade():
+    # Both enums persisted member names ('BOT_ONLY', 'THERAPIST_JOINED')
+    op.execute("ALTER TABLE chat_sessions ALTER COLUMN mode TYPE chatmode USING mode::text::chatmode")
+    op.execute("DROP TYPE IF EXISTS sessionmode")
+
+
+def downgrade():
+    op.execute("CREATE TYPE sessionmode AS ENUM ('BOT_ONLY', 'THERAPIST_JOINED')")
+    op.execute("ALTER TABLE chat_sessions ALTER COLUMN mode TYPE sessionmode USING mode::text::sessionmode")
@@ -2,17 +2,63 @@
 🚨 GLOBAL AI KILL SWITCH
 =====================
 
-Sessions in this set are FORBIDDEN from receiving AI responses.
+Sessions recorded here are FORBIDDEN from receiving AI responses.
 Once a therapist connects, the session is added here FOREVER.
 
 This is the SINGLE SOURCE OF TRUTH for AI disabling.
+
+When Redis is configured the kill switch is a Redis set shared by all
+workers; each worker keeps a bounded local cache of sessions it has
+already seen disabled so those checks never leave the process. Sessions
+seen enabled are cached too, for AI_ENABLED_CACHE_TTL_SECONDS, so most
+turns of ordinary sessions answer without a Redis round-trip; a disable
+on another worker takes effect here within that window.
 """
 
-# Session IDs where AI is PERMANENTLY DISABLED
-AI_DISABLED_SESSIONS: set = set()
+import time
+from collections import OrderedDict
+
+from app.core.logging import logger
+from app.core.redis_client import redis_client
+
+# Redis set holding every session where AI is PERMANENTLY DISABLED
+AI_DISABLED_KEY = "neurosupport:ai_disabled_sessions"
+
+# Upper bound on the local cache before the oldest entries are evicted
+AI_DISABLED_CACHE_SIZE = 100_000
+
+# Session IDs known to be disabled (local LRU cache, or the whole
+# kill switch when Redis is not configured)
+AI_DISABLED_SESSIONS: "OrderedDict[str, None]" = OrderedDict()
+
+# How long a negative Redis answer is trusted before asking again
+AI_ENABLED_CACHE_TTL_SECONDS = 10.0
+
+# Session IDs last seen enabled in Redis -> monotonic time the answer expires
+# (oldest first; only used when Redis is configured)
+AI_ENABLED_SESSIONS: "OrderedDict[str, float]" = OrderedDict()
+
+
+def _remember_disabled(session_id: str):
+    """Record a disabled session in the local cache, evicting the oldest entry if full"""
+    AI_DISABLED_SESSIONS[session_id] = None
+    AI_DISABLED_SESSIONS.move_to_end(session_id)
+    
+    # Without Redis the local cache is the only record, so never evict
+    if redis_client is not None and len(AI_DISABLED_SESSIONS) > AI_DISABLED_CACHE_SIZE:
+        AI_DISABLED_SESSIONS.popitem(last=False)
+
+
+def _remember_enabled(session_id: str):
+    """Cache a negative Redis answer for AI_ENABLED_CACHE_TTL_SECONDS, evicting the oldest entry if full"""
+    AI_ENABLED_SESSIONS[session_id] = time.monotonic() + AI_ENABLED_CACHE_TTL_SECONDS
+    AI_ENABLED_SESSIONS.move_to_end(session_id)
+    
+    if len(AI_ENABLED_SESSIONS) > AI_DISABLED_CACHE_SIZE:
+        AI_ENABLED_SESSIONS.popitem(last=False)
 
 
-def disable_ai_for_session(session_id: str):
+async def disable_ai_for_session(session_id: str):
     """
     Permanently disable AI for this session.
     Called when therapist connects.
@@ -20,10 +66,17 @@ def disable_ai_for_session(session_id: str):
     Args:
         session_id: Session to disable AI for
     """
-    AI_DISABLED_SESSIONS.add(session_id)
+    AI_ENABLED_SESSIONS.pop(session_id, None)
+    _remember_disabled(session_id)
+    
+    if redis_client is not None:
+        try:
+            await redis_client.sadd(AI_DISABLED_KEY, session_id)
+        except Exception as e:
+            logger.error("Failed to record AI kill switch in Redis for %s: %s", session_id, e)
 
 
-def is_ai_disabled(session_id: str) -> bool:
+async def is_ai_disabled(session_id: str) -> bool:
     """
     Check if AI is disabled for this session.
     
@@ -33,14 +86,44 @@ def is_ai_disabled(session_id: str) -> bool:
     Returns:
         True if AI is disabled, False otherwise
     """
-    return session_id in AI_DISABLED_SESSIONS
+    if session_id in AI_DISABLED_SESSIONS:
+        return True
+    
+    if redis_client is None:
+        return False
+    
+    # Recently confirmed enabled: answer locally
+    expires_at = AI_ENABLED_SESSIONS.get(session_id)
+    if expires_at is not None and expires_at > time.monotonic():
+        return False
+    
+    # Another worker may have disabled it
+    try:
+        disabled = bool(await redis_client.sismember(AI_DISABLED_KEY, session_id))
+    except Exception as e:
+        logger.error("Failed to check AI kill switch in Redis for %s: %s", session_id, e)
+        return False
+    
+    if disabled:
+        AI_ENABLED_SESSIONS.pop(session_id, None)
+        _remember_disabled(session_id)
+    else:
+        _remember_enabled(session_id)
+    
+    return disabled
 
 
-def enable_ai_for_session(session_id: str):
+async def enable_ai_for_session(session_id: str):
     """
     Re-enable AI for a session (for testing/admin purposes).
     
     Args:
         session_id: Session to enable AI for
     """
-    AI_DISABLED_SESSIONS.discard(session_id)
+    AI_DISABLED_SESSIONS.pop(session_id, None)
+    
+    if redis_client is not None:
+        try:
+            await redis_client.srem(AI_DISABLED_KEY, session_id)
+        except Exception as e:
+            logger.error("Failed to clear AI kill switch in Redis for %s: %s", session_id, e)
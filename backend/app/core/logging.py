@@ -1,23 +1,59 @@
 import logging
+import logging.handlers
+import queue
 import sys
-from typing import Any
+from typing import Any, Optional
+
+
+# Background thread that performs the actual stdout writes
+_listener: Optional[logging.handlers.QueueListener] = None
 
 
 def setup_logging() -> logging.Logger:
     """
     Configure application logging.
+    Records are pushed onto an in-memory queue and written to stdout by a
+    background listener thread, so logging never blocks the event loop.
     Returns configured logger instance.
     """
+    global _listener
+    
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+    
+    # Formatting happens once, in the listener; basicConfig would otherwise
+    # attach its default format to the queue handler as well
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
     logging.basicConfig(
         level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         handlers=[
-            logging.StreamHandler(sys.stdout)
+            queue_handler
         ]
     )
     
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    
     logger = logging.getLogger("neurosupport")
     return logger
 
 
+def stop_logging() -> None:
+    """
+    Flush queued log records and stop the listener thread.
+    Called on application shutdown.
+    """
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 logger = setup_logging()
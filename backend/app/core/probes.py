@@ -0,0 +1,37 @@
+import json
+from typing import Dict, Mapping
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class StaticJSONMiddleware:
+    """
+    Answers fixed-payload GET/HEAD endpoints (health checks, service info)
+    directly at the ASGI layer with pre-encoded bodies.
+    Load balancer probes never reach the router or other middleware.
+    """
+
+    def __init__(self, app: ASGIApp, responses: Mapping[str, dict]):
+        self.app = app
+        self._responses: Dict[str, tuple] = {}
+        for path, payload in responses.items():
+            body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+            headers = [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ]
+            self._responses[path] = (body, headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            cached = self._responses.get(scope["path"])
+            if cached is not None:
+                body, headers = cached
+                await send({"type": "http.response.start", "status": 200, "headers": headers})
+                await send({
+                    "type": "http.response.body",
+                    "body": body if scope["method"] == "GET" else b"",
+                })
+                return
+
+        await self.app(scope, receive, send)
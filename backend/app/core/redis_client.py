@@ -0,0 +1,45 @@
+"""
+Optional shared Redis client.
+
+Redis is used for state that must be consistent across uvicorn workers.
+When REDIS_URL is empty (the default) or the redis package is missing,
+redis_client is None and callers fall back to in-process state.
+"""
+
+from typing import TYPE_CHECKING, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+def _create_client() -> Optional["Redis"]:
+    """Create the async Redis client if Redis is configured"""
+    if not settings.REDIS_URL:
+        logger.info("Redis is disabled in settings - using in-process state")
+        return None
+    
+    try:
+        from redis.asyncio import Redis
+        
+        client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        logger.info("✅ Redis client configured")
+        return client
+        
+    except ImportError:
+        logger.error("redis package not installed - using in-process state")
+    except Exception as e:
+        logger.error("Failed to configure Redis client: %s", e)
+    
+    return None
+
+
+redis_client = _create_client()
+
+
+async def close_redis() -> None:
+    """Close the Redis connection pool on shutdown"""
+    if redis_client is not None:
+        await redis_client.close()
@@ -0,0 +1,106 @@
+"""
+Fast JSON encoding for WebSocket traffic.
+
+Uses orjson, which natively encodes UUID and datetime values. Frames are
+still sent as text because the frontend parses event.data as a string.
+"""
+
+from typing import Any, AsyncIterator, List, Union
+from uuid import UUID
+
+import orjson
+from fastapi import Response, WebSocket
+
+
+# Naive datetimes are UTC throughout the app; emit them with a "Z" suffix
+_DUMPS_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def _default(obj: Any) -> Any:
+    """Encode values orjson does not handle natively (e.g. uuid6.UUID subclasses)"""
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(message: Any) -> str:
+    """
+    Serialize a message to a JSON string.
+    
+    Args:
+        message: JSON-compatible data (UUID and datetime values allowed)
+        
+    Returns:
+        JSON text
+    """
+    return orjson.dumps(message, default=_default, option=_DUMPS_OPTIONS).decode("utf-8")
+
+
+def json_response(body: Union[str, bytes]) -> Response:
+    """
+    Wrap an already-encoded JSON body, bypassing FastAPI's response_model
+    validation. For trusted data read from the database, encoded with a
+    prebuilt TypeAdapter or model_dump_json (see model_construct).
+    
+    Args:
+        body: Encoded JSON
+        
+    Returns:
+        application/json Response
+    """
+    return Response(body, media_type="application/json")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON frame received from a client.
+    
+    Args:
+        data: Raw text or binary frame payload
+        
+    Returns:
+        Decoded JSON value
+    """
+    return orjson.loads(data)
+
+
+async def iter_json(websocket: WebSocket) -> AsyncIterator[Any]:
+    """
+    Parse incoming frames until the client disconnects.
+    Reads the raw ASGI message, so text and binary frames are both accepted
+    and handed to orjson as-is, without going through receive_text/receive_bytes.
+    
+    Args:
+        websocket: Accepted connection
+        
+    Yields:
+        Decoded JSON value of each frame
+    """
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        data = message.get("text")
+        yield orjson.loads(data if data is not None else message["bytes"])
+
+
+async def send_json(websocket: WebSocket, message: Any) -> None:
+    """
+    Send a message as an orjson-encoded text frame.
+    
+    Args:
+        websocket: Target connection
+        message: JSON-compatible data
+    """
+    await websocket.send_text(dumps(message))
+
+
+async def send_batch(websocket: WebSocket, frames: List[str]) -> None:
+    """
+    Send several frames in one {"type": "batch", "events": [...]} text frame.
+    
+    Args:
+        websocket: Target connection
+        frames: Frames already serialized with dumps (or pre-built constants)
+    """
+    await websocket.send_text('{"type":"batch","events":[' + ",".join(frames) + "]}")
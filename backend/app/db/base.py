@@ -1,6 +1,13 @@
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncAttrs
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Base(AsyncAttrs, DeclarativeBase):
+    """Declarative base for all models"""
+    # Fetch server-generated defaults (timestamps) via RETURNING on flush,
+    # so they are available without a lazy load or explicit refresh
+    __mapper_args__ = {"eager_defaults": True}
 
-Base = declarative_base()
 
 # Import all models here for Alembic auto-generation
 from app.models.visitor import Visitor  # noqa
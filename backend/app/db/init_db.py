@@ -1,16 +1,43 @@
+import asyncio
+from sqlalchemy import text
+
 from app.db.base import Base
 from app.db.session import engine
 from app.core.logging import logger
 
 
-def init_db() -> None:
+async def init_db() -> None:
     """
     Initialize database tables.
     Creates all tables defined in SQLAlchemy models.
     """
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
     except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
+        logger.error("Error creating database tables: %s", e)
         raise
+
+
+async def _ping() -> None:
+    """Check out one pooled connection and run a trivial query on it."""
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def warm_pool(n: int) -> None:
+    """
+    Pre-establish database connections so first requests hit a warm pool.
+    
+    Args:
+        n: Number of connections to open concurrently
+    """
+    if n <= 0:
+        return
+    
+    try:
+        await asyncio.gather(*[_ping() for _ in range(n)])
+        logger.info("Warmed database pool with %d connections", n)
+    except Exception as e:
+        logger.warning("Database pool warm-up failed: %s", e)
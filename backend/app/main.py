@@ -1,32 +1,60 @@
+import asyncio
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.logging import logger
-from app.db.init_db import init_db
+from app.core.cors import FastCORSMiddleware
+from app.core.probes import StaticJSONMiddleware
+from app.core.logging import logger, stop_logging
+from app.core.redis_client import close_redis
+from app.db.init_db import init_db, warm_pool
+from app.db.session import engine
 from app.routers import chat, appointments, therapist, analytics
+from app.services.emotion_service import emotion_analyzer
+from app.services.gemini_service import gemini_service
 from app.websocket import human_chat_ws
+from app.websocket.connection_manager import manager
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Application lifespan handler.
-    Initializes database on startup.
+    Initializes database and warms the connection pool on startup.
     """
     logger.info("Starting NeuroSupport application...")
     
-    # Initialize database
+    # Initialize database (schema is managed by Alembic outside DEBUG)
     try:
-        init_db()
-        logger.info("Database initialized successfully")
+        if settings.DEBUG or settings.CREATE_TABLES_ON_STARTUP:
+            await init_db()
+            logger.info("Database initialized successfully")
+        else:
+            logger.info("Skipping table creation; schema is managed by Alembic")
+        await warm_pool(settings.DB_POOL_WARM_SIZE)
     except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error("Failed to initialize database: %s", e)
+    
+    # Gemini SDK import and emotion model load run in threads while the server
+    # starts serving; until they finish, requests use the fallback paths
+    models_loading = asyncio.gather(
+        asyncio.to_thread(gemini_service.preload),
+        asyncio.to_thread(emotion_analyzer.load_model),
+        return_exceptions=True
+    )
     
     yield
     
     logger.info("Shutting down NeuroSupport application...")
+    # Failures come back as results, so a failed load never skips the teardown below
+    for result in await models_loading:
+        if isinstance(result, BaseException):
+            logger.error("Model loading failed: %s", result)
+    await engine.dispose()
+    await manager.close()
+    await close_redis()
+    stop_logging()
 
 
 # Create FastAPI application
@@ -34,20 +62,37 @@ app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Mental health support platform with real-time chat and emotion analysis",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
 # Configure CORS
+_ALLOWED_ORIGINS = frozenset({
+    settings.FRONTEND_URL,
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+})
+_FAST_PATHS = frozenset({"/health", "/"})
+
+app.add_middleware(
+    FastCORSMiddleware,
+    allow_origins=_ALLOWED_ORIGINS,
+    bypass_paths=_FAST_PATHS,
+)
+
+# Fixed-payload endpoints, answered before any other middleware runs
+_ROOT_PAYLOAD = {
+    "service": settings.APP_NAME,
+    "version": settings.APP_VERSION,
+    "status": "running"
+}
+_HEALTH_PAYLOAD = {
+    "status": "healthy"
+}
+
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        settings.FRONTEND_URL,
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    StaticJSONMiddleware,
+    responses={"/": _ROOT_PAYLOAD, "/health": _HEALTH_PAYLOAD},
 )
 
 # Include routers
@@ -58,22 +103,17 @@ app.include_router(therapist.router)
 app.include_router(analytics.router)
 
 
+# Served by StaticJSONMiddleware; kept as routes for the OpenAPI schema
 @app.get("/")
 def root():
     """Root endpoint"""
-    return {
-        "service": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "status": "running"
-    }
+    return _ROOT_PAYLOAD
 
 
 @app.get("/health")
 def health():
     """Health check endpoint"""
-    return {
-        "status": "healthy"
-    }
+    return _HEALTH_PAYLOAD
 
 
 if __name__ == "__main__":
@@ -82,5 +122,6 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        ws_per_message_deflate=False
     )
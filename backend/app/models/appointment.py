@@ -1,8 +1,7 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Enum as SQLEnum, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from datetime import datetime
-import uuid
+from uuid6 import uuid7
 import enum
 from app.db.base import Base
 
@@ -26,8 +25,14 @@ class Appointment(Base):
     Automatically linked to a chat session.
     """
     __tablename__ = "appointments"
-
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    __table_args__ = (
+        # Upcoming appointments: WHERE status = ... ORDER BY start_time
+        Index("ix_appt_status_start", "status", "start_time"),
+        # Analytics completion rate: WHERE created_at >= ... (counted by status)
+        Index("ix_appt_created_status", "created_at", "status"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     visitor_id = Column(UUID(as_uuid=True), ForeignKey("visitors.id"), nullable=False, index=True)
     session_id = Column(UUID(as_uuid=True), nullable=False, unique=True, index=True)  # Chat session UUID
     
@@ -36,8 +41,8 @@ class Appointment(Base):
     status = Column(SQLEnum(AppointmentStatus), default=AppointmentStatus.SCHEDULED, nullable=False)
     chat_mode = Column(SQLEnum(ChatMode), default=ChatMode.BOT_ONLY, nullable=False)  # Controls bot behavior
     
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     # Relationships
     visitor = relationship("Visitor", back_populates="appointments")
@@ -1,10 +1,10 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Enum as SQLEnum, Float
+from sqlalchemy import Column, Text, DateTime, ForeignKey, Index, Enum as SQLEnum, Float, Boolean, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from datetime import datetime
-import uuid
+from uuid6 import uuid7
 import enum
 from app.db.base import Base
+from app.models.emotion import EmotionLabel
 
 
 class SenderType(str, enum.Enum):
@@ -20,21 +20,25 @@ class ChatMessage(Base):
     Includes emotion analysis data for each message.
     """
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Chat history: WHERE session_id = ... ORDER BY created_at
+        Index("ix_chat_session_created", "session_id", "created_at"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    session_id = Column(UUID(as_uuid=True), nullable=False, index=True)  # Chat session UUID
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    session_id = Column(UUID(as_uuid=True), nullable=False)  # Chat session UUID (indexed via ix_chat_session_created)
     visitor_id = Column(UUID(as_uuid=True), ForeignKey("visitors.id"), nullable=True, index=True)
     
     sender_type = Column(SQLEnum(SenderType), nullable=False)
     content = Column(Text, nullable=False)
     
     # Emotion analysis
-    emotion = Column(String, nullable=True)
+    emotion = Column(EmotionLabel, nullable=True)
     confidence = Column(Float, nullable=True)
     
     # Metadata
-    is_read = Column(String, default="false")  # Simple read receipt tracking
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    is_read = Column(Boolean, default=False, nullable=False)  # Simple read receipt tracking
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
     # Relationships
     visitor = relationship("Visitor", back_populates="chat_messages")
@@ -1,10 +1,17 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, func
 from sqlalchemy.dialects.postgresql import UUID
-from datetime import datetime
-import uuid
+from uuid6 import uuid7
+import enum
 from app.db.base import Base
 
 
+class EscalationDecision(str, enum.Enum):
+    """User's answer to an escalation suggestion"""
+    PENDING = "pending"
+    ACCEPTED = "accepted"
+    DECLINED = "declined"
+
+
 class ChatEscalation(Base):
     """
     Tracks when a chat session has been escalated to a therapist.
@@ -12,17 +19,25 @@ class ChatEscalation(Base):
     """
     __tablename__ = "chat_escalations"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     session_id = Column(UUID(as_uuid=True), nullable=False, unique=True, index=True)
     
     # Reason for escalation: "emotional_distress" or "low_ai_confidence"
     reason = Column(String, nullable=False)
     
     # Whether user accepted the appointment suggestion
-    user_accepted = Column(String, default="pending")  # "pending", "accepted", "declined"
+    user_accepted = Column(
+        SQLEnum(
+            EscalationDecision,
+            name="escalation_response",
+            values_callable=lambda e: [member.value for member in e]
+        ),
+        default=EscalationDecision.PENDING,
+        nullable=False
+    )
     
     # Linked appointment ID if accepted
     appointment_id = Column(UUID(as_uuid=True), nullable=True)
     
-    triggered_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    resolved_at = Column(DateTime, nullable=True)
+    triggered_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)  # Escalation list: ORDER BY triggered_at DESC
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
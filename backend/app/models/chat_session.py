@@ -4,18 +4,11 @@ Chat Session Model
 Tracks the state of each chat session to determine if bot or therapist is active.
 """
 
-from sqlalchemy import Column, String, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, func
 from sqlalchemy.dialects.postgresql import UUID
-from datetime import datetime
-import uuid
-import enum
+from uuid6 import uuid7
 from app.db.base import Base
-
-
-class SessionMode(str, enum.Enum):
-    """Session mode enum"""
-    BOT_ONLY = "bot_only"
-    THERAPIST_JOINED = "therapist_joined"
+from app.models.appointment import ChatMode
 
 
 class ChatSession(Base):
@@ -25,9 +18,9 @@ class ChatSession(Base):
     """
     __tablename__ = "chat_sessions"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     session_id = Column(UUID(as_uuid=True), unique=True, nullable=False, index=True)
-    mode = Column(SQLEnum(SessionMode), default=SessionMode.BOT_ONLY, nullable=False)
-    therapist_joined_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    mode = Column(SQLEnum(ChatMode), default=ChatMode.BOT_ONLY, nullable=False)  # Shares the chatmode type with appointments
+    therapist_joined_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
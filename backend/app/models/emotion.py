@@ -1,23 +1,61 @@
-from sqlalchemy import Column, String, Float, DateTime, Text
+from sqlalchemy import Column, Float, DateTime, Text, Index, SmallInteger, func
 from sqlalchemy.dialects.postgresql import UUID
-from datetime import datetime
-import uuid
+from sqlalchemy.types import TypeDecorator
+from uuid6 import uuid7
+import enum
 from app.db.base import Base
 
 
+class EmotionCode(enum.IntEnum):
+    """Stored code of each emotion label"""
+    NEUTRAL = 0
+    JOY = 1
+    SADNESS = 2
+    ANGER = 3
+    FEAR = 4
+    SURPRISE = 5
+    DISGUST = 6
+    ANXIETY = 7
+
+
+# Lowercase label <-> code, built once for the column type below
+EMOTION_CODES = {code.name.lower(): code.value for code in EmotionCode}
+_EMOTION_LABELS = {value: label for label, value in EMOTION_CODES.items()}
+
+
+class EmotionLabel(TypeDecorator):
+    """
+    Emotion label stored as a SMALLINT code (2 bytes instead of a varchar).
+    The application keeps using lowercase label strings ("sadness");
+    they are mapped to EmotionCode on write and back on read.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else EMOTION_CODES[value]
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else _EMOTION_LABELS[value]
+
+
 class EmotionData(Base):
     """
     Stores aggregated emotion analysis data for analytics.
     Separated from ChatMessage for optimized analytics queries.
     """
     __tablename__ = "emotion_data"
+    __table_args__ = (
+        # Session emotion timeline: WHERE session_id = ... ORDER BY created_at
+        Index("ix_emotion_session_created", "session_id", "created_at"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    session_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    session_id = Column(UUID(as_uuid=True), nullable=False)  # Indexed via ix_emotion_session_created
     message_id = Column(UUID(as_uuid=True), nullable=False, index=True)
     
-    emotion = Column(String, nullable=False, index=True)
+    emotion = Column(EmotionLabel, nullable=False, index=True)
     confidence = Column(Float, nullable=False)
     message_content = Column(Text, nullable=True)  # Optional: store for context
     
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -1,8 +1,7 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from datetime import datetime
-import uuid
+from uuid6 import uuid7
 from app.db.base import Base
 
 
@@ -13,9 +12,9 @@ class Visitor(Base):
     """
     __tablename__ = "visitors"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     name = Column(String, nullable=True)  # Optional display name
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     # Relationships
     appointments = relationship("Appointment", back_populates="visitor", cascade="all, delete-orphan")
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from app.db.session import get_db
 from app.schemas.appointment import AppointmentCreate, AppointmentResponse, AppointmentUpdate
@@ -15,131 +17,127 @@ from app.core.logging import logger
 
 router = APIRouter(prefix="/api/appointments", tags=["appointments"])
 
+# Validates a whole page of ORM rows in one pydantic-core call
+_APPOINTMENT_LIST_ADAPTER = TypeAdapter(List[AppointmentResponse])
+
+_MONTHS = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+)
+_BOOKED_ICON = "✅"
+_CLOCK_ICON = "🕒"
+
+
+def _format_slot_time(start_time: datetime) -> str:
+    """
+    Format a slot as e.g. "January 05 at 02:30 PM UTC" without strftime.
+    
+    Args:
+        start_time: Slot start time (UTC)
+        
+    Returns:
+        Human-readable slot time
+    """
+    hour12 = start_time.hour % 12 or 12
+    ampm = "AM" if start_time.hour < 12 else "PM"
+    return f"{_MONTHS[start_time.month - 1]} {start_time.day:02d} at {hour12:02d}:{start_time.minute:02d} {ampm} UTC"
+
 
 @router.post("/", response_model=AppointmentResponse)
-def create_appointment(
+async def create_appointment(
     appointment: AppointmentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new appointment.
     Automatically creates a visitor and linked chat session.
     """
     try:
-        new_appointment = appointment_service.create_appointment(db, appointment)
-        
-        # Include visitor name in response
-        response_data = AppointmentResponse.from_orm(new_appointment)
-        response_data.visitor_name = new_appointment.visitor.name
-        
-        return response_data
+        new_appointment = await appointment_service.create_appointment(db, appointment)
+        return AppointmentResponse.model_validate(new_appointment)
     except Exception as e:
-        logger.error(f"Error creating appointment: {e}")
+        logger.error("Error creating appointment: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/", response_model=List[AppointmentResponse])
-def get_appointments(
+async def get_appointments(
     status: Optional[AppointmentStatus] = None,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get all appointments, optionally filtered by status.
     """
-    appointments = appointment_service.get_all_appointments(db, status, limit)
-    
-    # Add visitor names to responses
-    responses = []
-    for appt in appointments:
-        response = AppointmentResponse.from_orm(appt)
-        response.visitor_name = appt.visitor.name if appt.visitor else None
-        responses.append(response)
-    
-    return responses
+    appointments = await appointment_service.get_all_appointments(db, status, limit)
+    return _APPOINTMENT_LIST_ADAPTER.validate_python(appointments, from_attributes=True)
 
 
 @router.get("/upcoming", response_model=List[AppointmentResponse])
-def get_upcoming_appointments(
+async def get_upcoming_appointments(
     limit: int = 50,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get upcoming scheduled appointments.
     """
-    appointments = appointment_service.get_upcoming_appointments(db, limit)
-    
-    responses = []
-    for appt in appointments:
-        response = AppointmentResponse.from_orm(appt)
-        response.visitor_name = appt.visitor.name if appt.visitor else None
-        responses.append(response)
-    
-    return responses
+    appointments = await appointment_service.get_upcoming_appointments(db, limit)
+    return _APPOINTMENT_LIST_ADAPTER.validate_python(appointments, from_attributes=True)
 
 
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
-def get_appointment(
+async def get_appointment(
     appointment_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific appointment by ID.
     """
-    appointment = appointment_service.get_appointment(db, appointment_id)
+    appointment = await appointment_service.get_appointment(db, appointment_id)
     
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    response = AppointmentResponse.from_orm(appointment)
-    response.visitor_name = appointment.visitor.name if appointment.visitor else None
-    
-    return response
+    return AppointmentResponse.model_validate(appointment)
 
 
 @router.patch("/{appointment_id}", response_model=AppointmentResponse)
-def update_appointment(
+async def update_appointment(
     appointment_id: UUID,
     update_data: AppointmentUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update an appointment (status, end_time, etc.).
     """
-    appointment = appointment_service.update_appointment(db, appointment_id, update_data)
+    appointment = await appointment_service.update_appointment(db, appointment_id, update_data)
     
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    response = AppointmentResponse.from_orm(appointment)
-    response.visitor_name = appointment.visitor.name if appointment.visitor else None
-    
-    return response
+    return AppointmentResponse.model_validate(appointment)
 
 
 @router.get("/session/{session_id}", response_model=AppointmentResponse)
-def get_appointment_by_session(
+async def get_appointment_by_session(
     session_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get appointment by chat session ID.
     """
-    appointment = appointment_service.get_appointment_by_session(db, session_id)
+    appointment = await appointment_service.get_appointment_by_session(db, session_id)
     
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found for this session")
     
-    response = AppointmentResponse.from_orm(appointment)
-    response.visitor_name = appointment.visitor.name if appointment.visitor else None
-    
-    return response
+    return AppointmentResponse.model_validate(appointment)
 
 
 @router.post("/auto-book", response_model=AutoBookResponse)
-def auto_book_appointment(
+async def auto_book_appointment(
     request: AutoBookRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Automatically book an appointment when chat escalation is triggered.
@@ -147,12 +145,12 @@ def auto_book_appointment(
     """
     try:
         # Check if appointment already exists for this session
-        existing_appointment = db.query(Appointment)\
-            .filter(Appointment.session_id == request.session_id)\
-            .first()
+        existing_appointment = await db.scalar(
+            select(Appointment).where(Appointment.session_id == request.session_id)
+        )
         
         if existing_appointment:
-            logger.info(f"Appointment already exists for session {request.session_id}")
+            logger.info("Appointment already exists for session %s", request.session_id)
             return AutoBookResponse(
                 appointment_id=existing_appointment.id,
                 session_id=existing_appointment.session_id,
@@ -163,48 +161,46 @@ def auto_book_appointment(
         
         # Find or create visitor
         if request.visitor_id:
-            visitor = db.query(Visitor).filter(Visitor.id == request.visitor_id).first()
+            visitor = await db.scalar(select(Visitor).where(Visitor.id == request.visitor_id))
             if not visitor:
                 visitor = Visitor(name=request.visitor_name)
                 db.add(visitor)
-                db.flush()
         else:
             visitor = Visitor(name=request.visitor_name or "Anonymous")
             db.add(visitor)
-            db.flush()
         
         # Calculate next available slot (for demo: 2 hours from now)
-        start_time = datetime.utcnow() + timedelta(hours=2)
+        start_time = datetime.now(timezone.utc) + timedelta(hours=2)
         end_time = start_time + timedelta(minutes=45)
         
         # Create appointment
         appointment = Appointment(
-            visitor_id=visitor.id,
+            visitor=visitor,
             session_id=request.session_id,
             start_time=start_time,
             end_time=end_time,
             status=AppointmentStatus.SCHEDULED
         )
-        
         db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
+        await db.flush()  # Assigns ids; committed together with the escalation update below
         
         # Update escalation record with appointment ID
-        escalation = db.query(ChatEscalation)\
-            .filter(ChatEscalation.session_id == request.session_id)\
-            .first()
+        escalation = await db.scalar(
+            select(ChatEscalation).where(ChatEscalation.session_id == request.session_id)
+        )
         
         if escalation:
             escalation.appointment_id = appointment.id
-            escalation.resolved_at = datetime.utcnow()
-            db.commit()
+            escalation.resolved_at = datetime.now(timezone.utc)
+        
+        # Single commit for visitor, appointment and escalation
+        await db.commit()
         
-        logger.info(f"Auto-booked appointment {appointment.id} for session {request.session_id}")
+        logger.info("Auto-booked appointment %s for session %s", appointment.id, request.session_id)
         
         # Format confirmation message
-        time_str = start_time.strftime("%B %d at %I:%M %p UTC")
-        confirmation_message = f"✅ Your appointment has been booked.\n🕒 {time_str}\nA therapist will join you here at that time."
+        time_str = _format_slot_time(start_time)
+        confirmation_message = f"{_BOOKED_ICON} Your appointment has been booked.\n{_CLOCK_ICON} {time_str}\nA therapist will join you here at that time."
         
         return AutoBookResponse(
             appointment_id=appointment.id,
@@ -215,5 +211,5 @@ def auto_book_appointment(
         )
         
     except Exception as e:
-        logger.error(f"Error auto-booking appointment: {e}")
+        logger.error("Error auto-booking appointment: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,30 +1,182 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import List, Optional
 from uuid import UUID, uuid4
-from datetime import datetime
-import json
+from uuid6 import uuid7
+from contextlib import aclosing
+from datetime import datetime, timezone
 import re
+import sys
 
-from app.db.session import get_db
-from app.schemas.chat import ChatMessageCreate, ChatMessageResponse, ChatHistoryRequest
-from app.models.chat import SenderType
+from app.db.session import AsyncSessionLocal, get_db
+from app.schemas.chat import ChatMessageCreate, ChatMessageResponse, ChatMessageListAdapter, ChatHistoryRequest, MessageFrame, MESSAGE_MAX_LENGTH
+from app.models.chat import ChatMessage, SenderType
 from app.models.visitor import Visitor
-from app.models.chat_escalation import ChatEscalation
+from app.models.chat_escalation import ChatEscalation, EscalationDecision
 from app.models.appointment import Appointment, ChatMode
 from app.services.chat_service import chat_service
 from app.services.chat_health_service import chat_health_service
-from app.websocket.connection_manager import manager
+from app.services.session_state_service import session_state_service
+from app.websocket.connection_manager import USER_CHAT, manager
+from app.websocket.frame_writer import FrameWriter
+from app.core.config import settings
 from app.core.logging import logger
+from app.core.serialization import dumps, iter_json, json_response
 from app.core.ai_lock import AI_DISABLED_SESSIONS, disable_ai_for_session, is_ai_disabled
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
+# Constant frames, serialized once
+_AI_TYPING_START = dumps({"type": "typing", "sender": "ai", "is_typing": True})
+_AI_TYPING_STOP = dumps({"type": "typing", "sender": "ai", "is_typing": False})
+
+# Emitted by Gemini (and the fallback) when the user should see a therapist
+_ESCALATE_TOKEN = "<<ESCALATE>>"
+
+# SYSTEM_SUGGESTION frames, serialized once per reason; only the session id varies
+_SID_PLACEHOLDER = "__SESSION_ID__"
+_HEALTH_SUGGESTION = "I want to make sure you get the best support. It might help to talk with a professional therapist. Would you like me to book an appointment for you?"
+_SUGGESTION_TEMPLATES = {
+    reason: dumps({
+        "type": "SYSTEM_SUGGESTION",
+        "session_id": _SID_PLACEHOLDER,
+        "message": message,
+        "reason": reason
+    })
+    for reason, message in (
+        ("user_request", "I understand you'd like to speak with a therapist. Would you like me to book an appointment for you right away?"),
+        ("gemini_detected", "I can help you connect with a therapist. Would you like me to book an appointment for you?"),
+        ("ai_repetition", _HEALTH_SUGGESTION),
+        ("emotional_distress", _HEALTH_SUGGESTION),
+        ("low_ai_confidence", _HEALTH_SUGGESTION),
+    )
+}
+
+# Reply to an accepted escalation, filled in like the suggestion templates
+_ACCEPTED_TEMPLATE = dumps({
+    "type": "ESCALATION_ACCEPTED",
+    "session_id": _SID_PLACEHOLDER,
+    "message": "Perfect! Let me book an appointment for you right away..."
+})
+
+# Frontend sender labels for stored messages
+_SENDER_LABELS = {
+    SenderType.VISITOR: "user",
+    SenderType.THERAPIST: "therapist",
+    SenderType.AI: "ai",
+}
+
+# User answers to an escalation suggestion (whole words only, so "booking" is not "ok");
+# matched against the already-lowercased message
+_ACCEPT_RE = re.compile(r"\b(?:yes|ok(?:ay)?|sure|book|please|confirm)\b")
+_DECLINE_RE = re.compile(r"\b(?:no|not\s+now|later|maybe\s+later|decline|nope)\b")
+
+
+def _message_frame(chat_message: ChatMessage) -> MessageFrame:
+    """
+    Build the WebSocket frame for a stored chat message.
+    
+    Args:
+        chat_message: Persisted message (id and created_at populated)
+        
+    Returns:
+        Frame ready for dumps/send_json
+    """
+    return {
+        "type": "message",
+        "id": chat_message.id,
+        "session_id": chat_message.session_id,
+        "sender": _SENDER_LABELS[chat_message.sender_type],
+        "content": chat_message.content,
+        "emotion": chat_message.emotion,
+        "confidence": chat_message.confidence,
+        "created_at": chat_message.created_at
+    }
+
+
+def _partial_token_length(text: str) -> int:
+    """
+    Length of the longest proper prefix of the escalate token that ends the text.
+    
+    Args:
+        text: Response streamed so far
+        
+    Returns:
+        Number of trailing characters that may still become <<ESCALATE>>
+    """
+    for length in range(min(len(text), len(_ESCALATE_TOKEN) - 1), 0, -1):
+        if text.endswith(_ESCALATE_TOKEN[:length]):
+            return length
+    return 0
+
+
+def _suggestion_frame(reason: str, session_id: str) -> str:
+    """
+    Fill in a pre-serialized SYSTEM_SUGGESTION frame.
+    
+    Args:
+        reason: Escalation reason (a _SUGGESTION_TEMPLATES key)
+        session_id: Validated session UUID string (needs no JSON escaping)
+        
+    Returns:
+        JSON text frame
+    """
+    return _SUGGESTION_TEMPLATES[reason].replace(_SID_PLACEHOLDER, session_id, 1)
+
+
+async def _open_escalation(db: AsyncSession, session_id: UUID, reason: str) -> Optional[UUID]:
+    """
+    Create the session's escalation record in one idempotent statement.
+    chat_escalations.session_id is unique, so a concurrent insert for the
+    same session (another tab or worker) is skipped instead of failing.
+    
+    Args:
+        db: Database session (caller commits)
+        session_id: Chat session UUID
+        reason: Escalation reason
+        
+    Returns:
+        New escalation id, or None if the session already had one
+    """
+    escalation_id = await db.scalar(
+        pg_insert(ChatEscalation)
+        .values(session_id=session_id, reason=reason, user_accepted=EscalationDecision.PENDING)
+        .on_conflict_do_nothing(index_elements=[ChatEscalation.session_id])
+        .returning(ChatEscalation.id)
+    )
+    # The one log line per escalation event
+    logger.info("🚨 Escalation for session %s: reason=%s id=%s", session_id, reason, escalation_id)
+    return escalation_id
+
+
+async def _record_escalation_answer(
+    db: AsyncSession,
+    session_id: UUID,
+    decision: EscalationDecision,
+    answered_at: datetime
+):
+    """
+    Store the user's answer with a keyed UPDATE (no row load).
+    
+    Args:
+        db: Database session (caller commits)
+        session_id: Chat session UUID
+        decision: ACCEPTED or DECLINED
+        answered_at: Timestamp of the answering message
+    """
+    await db.execute(
+        update(ChatEscalation)
+        .where(ChatEscalation.session_id == session_id)
+        .values(user_accepted=decision, resolved_at=answered_at)
+    )
+
 
 @router.post("/session/create")
-def create_chat_session(
+async def create_chat_session(
     visitor_name: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new chat session with optional visitor name.
@@ -33,13 +185,12 @@ def create_chat_session(
     # Create visitor
     visitor = Visitor(name=visitor_name)
     db.add(visitor)
-    db.commit()
-    db.refresh(visitor)
+    await db.commit()  # id and created_at come back via INSERT ... RETURNING
     
     # Generate session ID
     session_id = uuid4()
     
-    logger.info(f"Created chat session {session_id} for visitor {visitor.id}")
+    logger.info("Created chat session %s for visitor %s", session_id, visitor.id)
     
     return {
         "session_id": str(session_id),
@@ -49,97 +200,144 @@ def create_chat_session(
 
 
 @router.post("/messages", response_model=ChatMessageResponse)
-def create_message(
+async def create_message(
     message: ChatMessageCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new chat message.
     Used for HTTP-based message creation (fallback for WebSocket).
     """
     try:
-        chat_message = chat_service.create_message(db, message)
+        chat_message = await chat_service.create_message(db, message)
         return chat_message
     except Exception as e:
-        logger.error(f"Error creating message: {e}")
+        logger.error("Error creating message: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/messages/bulk", responses={200: {"model": List[ChatMessageResponse]}})
+async def create_messages_bulk(
+    messages: List[ChatMessageCreate] = Body(..., min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create several chat messages at once (e.g. a burst of pasted lines).
+    Stored with multi-row INSERTs in a single transaction.
+    """
+    try:
+        rows = await chat_service.create_messages_bulk(db, messages)
+    except Exception as e:
+        logger.error("Error creating messages: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return json_response(ChatMessageListAdapter.dump_json([
+        ChatMessageResponse.model_construct(
+            id=row["id"],
+            session_id=row["session_id"],
+            sender_type=row["sender_type"],
+            content=row["content"],
+            emotion=row["emotion"],
+            confidence=row["confidence"],
+            is_read=row["is_read"],
+            created_at=row["created_at"]
+        )
+        for row in rows
+    ]))
 
 
-@router.get("/messages/{session_id}", response_model=List[ChatMessageResponse])
-def get_chat_history(
+@router.get("/messages/{session_id}", responses={200: {"model": List[ChatMessageResponse]}})
+async def get_chat_history(
     session_id: UUID,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Retrieve chat history for a session.
     """
-    messages = chat_service.get_chat_history(db, session_id, limit)
-    return messages
+    messages = await chat_service.get_chat_history(db, session_id, limit)
+    # Trusted rows: built without validation and encoded by the prebuilt adapter
+    return json_response(ChatMessageListAdapter.dump_json([
+        ChatMessageResponse.model_construct(
+            id=message.id,
+            session_id=message.session_id,
+            sender_type=message.sender_type,
+            content=message.content,
+            emotion=message.emotion,
+            confidence=message.confidence,
+            is_read=message.is_read,
+            created_at=message.created_at
+        )
+        for message in messages
+    ]))
 
 
 @router.get("/session/{session_id}/stats")
-def get_session_stats(
+async def get_session_stats(
     session_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get statistics for a chat session.
     """
-    stats = chat_service.get_session_stats(db, session_id)
+    stats = await chat_service.get_session_stats(db, session_id)
     return stats
 
 
 @router.post("/therapist/join/{appointment_id}")
 async def therapist_join_appointment(
     appointment_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Therapist joins an appointment chat.
     Sets chat_mode to THERAPIST_JOINED and notifies the user.
     """
-    logger.info(f"🧑‍⚕️ Therapist joining appointment {appointment_id}")
+    logger.info("🧑‍⚕️ Therapist joining appointment %s", appointment_id)
     
-    # Get appointment
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    # Update chat mode to THERAPIST_JOINED in one round-trip (no Appointment is loaded)
+    session_id = await db.scalar(
+        update(Appointment)
+        .where(Appointment.id == appointment_id)
+        .values(chat_mode=ChatMode.THERAPIST_JOINED)
+        .returning(Appointment.session_id)
+    )
     
-    if not appointment:
+    if session_id is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    # Update chat mode to THERAPIST_JOINED
-    appointment.chat_mode = ChatMode.THERAPIST_JOINED
-    db.commit()
+    await db.commit()
+    await session_state_service.set_chat_mode(session_id, ChatMode.THERAPIST_JOINED)
     
-    logger.info(f"✅ Appointment {appointment_id} chat_mode changed to THERAPIST_JOINED")
+    logger.info("✅ Appointment %s chat_mode changed to THERAPIST_JOINED", appointment_id)
     
     # Send system message to notify user
+    session_key = str(session_id)
     system_message = {
         "type": "message",  # Changed from "system" to "message" so frontend displays it
         "sender": "system",
         "content": "🧑‍⚕️ Therapist has joined. You can talk directly now.",
-        "session_id": str(appointment.session_id),
-        "timestamp": datetime.utcnow().isoformat(),
+        "session_id": session_key,
+        "timestamp": datetime.now(timezone.utc),
         "emotion": None,
         "confidence": None
     }
     
-    await manager.broadcast_to_session(system_message, str(appointment.session_id))
-    logger.warning(f"📢 Sent therapist join notification to session {appointment.session_id}")
+    await manager.broadcast_to_session(system_message, session_key)
+    logger.warning("📢 Sent therapist join notification to session %s", session_id)
     
     return {
         "status": "ok",
         "appointment_id": str(appointment_id),
-        "session_id": str(appointment.session_id),
-        "chat_mode": appointment.chat_mode.value
+        "session_id": session_key,
+        "chat_mode": ChatMode.THERAPIST_JOINED.value
     }
 
 
 @router.websocket("/ws/user-chat/{session_id}")
 async def user_chat_websocket(
     websocket: WebSocket,
-    session_id: str,
-    db: Session = Depends(get_db)
+    session_id: str
 ):
     """
     🤖 USER CHAT ONLY - BOT INTERACTIONS
@@ -151,13 +349,40 @@ async def user_chat_websocket(
     """
     # 🤖 BOT-ONLY ENDPOINT - Accept connection
     await websocket.accept()
-    logger.warning(f"🤖 USER-CHAT: Bot connection accepted for session {session_id}")
+    logger.info("🤖 USER-CHAT: Bot connection accepted for session %s", session_id)
+    
+    # Rows built this turn but not yet stored
+    pending_rows = []
+    # A decline not yet stored (its message's timestamp); written with the turn's other rows
+    pending_decline_at = None
+    # Last visitor_id seen and its parsed UUID (clients resend the same one every message)
+    visitor_id_raw = visitor_uuid = None
+    # Parsed (and interned) once per connection and reused for every frame
+    session_id = sys.intern(session_id)
+    try:
+        session_uuid = UUID(session_id)
+    except ValueError:
+        logger.error("❌ USER-CHAT: Invalid session id %s", session_id)
+        await websocket.close(code=1008)
+        return
+    
+    # Cap sockets per session so one client cannot tie up the event loop
+    if manager.user_chat_count(session_id) >= settings.WS_MAX_CONNECTIONS_PER_SESSION:
+        logger.warning("❌ USER-CHAT: Connection limit reached for session %s", session_id)
+        await websocket.close(code=1008)
+        return
+    
+    # Outbound frames are queued here and sent (coalesced) by one writer task
+    writer = FrameWriter(websocket)
+    # Serializes turns with other sockets (tabs) of the same session
+    turn_lock = manager.acquire_turn_lock(session_id)
     
     try:
-        while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
+        # Session broadcasts (e.g. the therapist-join notice) reach this socket
+        await manager.connect(session_id, USER_CHAT, websocket, writer)
+        
+        # Ends cleanly when the client disconnects
+        async for message_data in iter_json(websocket):
             
             # Handle typing indicators
             if message_data.get("type") == "typing":
@@ -166,252 +391,257 @@ async def user_chat_websocket(
             
             # Get content
             content = message_data.get("content", "")
-            if not content.strip():
+            # Normalized once; the answer, intent and keyword checks all read content_lower
+            content_norm = content.strip()
+            if not content_norm:
                 continue
+            if len(content) > MESSAGE_MAX_LENGTH:
+                logger.warning("USER-CHAT: Dropped over-long message (%d chars) in session %s", len(content), session_id)
+                continue
+            content_lower = content_norm.lower()
             
-            # 🤖 BOT ENDPOINT - Sender is always "user"
-            logger.warning(f"📨 USER-CHAT: Received message from user in session {session_id}")
-            
-            # Save user message to database (with emotion detection)
-            message_create = ChatMessageCreate(
-                session_id=UUID(session_id),
-                sender_type=SenderType.VISITOR,
-                content=content,
-                visitor_id=UUID(message_data["visitor_id"]) if message_data.get("visitor_id") else None
-            )
-            chat_message = chat_service.create_message(db, message_create)
-            logger.info(f"💾 USER-CHAT: Saved user message to database")
-            
-            # Prepare message response
-            message_response = {
-                "type": "message",
-                "id": str(chat_message.id),
-                "session_id": str(chat_message.session_id),
-                "sender": "user",
-                "content": chat_message.content,
-                "emotion": chat_message.emotion,
-                "confidence": chat_message.confidence,
-                "created_at": chat_message.created_at.isoformat()
-            }
-            
-            # Send user message back (echo)
-            await websocket.send_json(message_response)
-            logger.info(f"✅ USER-CHAT: Echoed user message")
-            
-            # 🤖 GENERATE AI RESPONSE (this is bot-only endpoint)
-            logger.warning(f"🤖 USER-CHAT: Generating AI response")
-            
-            # ============================================
-            # STEP 1: Check if ANY escalation exists for this session
-            # ============================================
-            any_existing_escalation = db.query(ChatEscalation)\
-                .filter(ChatEscalation.session_id == UUID(session_id))\
-                .first()
-            
-            # ============================================
-            # STEP 2: If escalation exists and pending, check for user response
-            # ============================================
-            if any_existing_escalation and any_existing_escalation.user_accepted == "pending":
-                user_content_lower = message_create.content.lower().strip()
-                
-                # Check for acceptance
-                if any(word in user_content_lower for word in ["yes", "okay", "ok", "sure", "book", "please", "confirm"]):
-                    logger.info(f"✅ User ACCEPTED escalation for session {session_id}")
-                    any_existing_escalation.user_accepted = "accepted"
-                    any_existing_escalation.resolved_at = datetime.utcnow()
-                    db.commit()
-                    
-                    # Send acceptance confirmation
-                    confirmation_message = {
-                        "type": "ESCALATION_ACCEPTED",
-                        "session_id": session_id,
-                        "message": "Perfect! Let me book an appointment for you right away..."
-                    }
-                    await websocket.send_json(confirmation_message)
-                    continue  # Don't generate AI response
-                
-                # Check for decline
-                elif any(word in user_content_lower for word in ["no", "not now", "later", "maybe later", "decline", "nope"]):
-                    logger.info(f"❌ User DECLINED escalation for session {session_id}")
-                    any_existing_escalation.user_accepted = "declined"
-                    any_existing_escalation.resolved_at = datetime.utcnow()
-                    db.commit()
-                    # Continue to AI response below
-            
-            # ============================================
-            # STEP 3: IMMEDIATE INTENT CHECK (if no escalation exists yet)
-            # ============================================
-            if not any_existing_escalation:
-                    logger.warning(f"=" * 80)
-                    logger.warning(f"🔍 CHECKING FOR ESCALATION INTENT")
-                    logger.warning(f"Session: {session_id}")
-                    logger.warning(f"Message: '{message_create.content}'")
-                    logger.warning(f"=" * 80)
-                    
+            # One turn per session at a time; one short-lived session per message,
+            # so the connection goes back to the pool between turns
+            async with turn_lock, AsyncSessionLocal() as db:
+                # 🤖 BOT ENDPOINT - Sender is always "user"
+                logger.debug("📨 USER-CHAT: Received message from user in session %s", session_id)
+                # Session's last messages for the health check, shared with its other
+                # sockets; seeded from the DB once, then kept current in memory
+                recent_window = manager.get_history_window(session_id)
+
+                # Save user message to database (with emotion detection)
+                visitor_id = message_data.get("visitor_id")
+                if visitor_id != visitor_id_raw:
+                    visitor_uuid = UUID(visitor_id) if visitor_id else None
+                    visitor_id_raw = visitor_id
+                # Built in memory (id and created_at assigned); inserted together
+                # with the rest of this turn's writes
+                pending_rows = await chat_service.build_message_fast(
+                    session_uuid, SenderType.VISITOR, content, visitor_uuid
+                )
+                chat_message = pending_rows[0]
+
+                # Echo of the user message goes out now, before any cache or database work
+                writer.send(dumps(_message_frame(chat_message)))
+
+                # Bot stays silent once a therapist has joined (cached, no per-message query)
+                chat_mode = await session_state_service.get_chat_mode(db, session_uuid)
+                if chat_mode == ChatMode.THERAPIST_JOINED:
+                    logger.debug("🧑‍⚕️ USER-CHAT: Therapist joined session %s - skipping AI response", session_id)
+                    db.add_all(pending_rows)
+                    pending_rows = []
+                    await db.commit()
+                    if recent_window is not None:
+                        recent_window.append(chat_message)
+                    continue
+
+                # 🤖 GENERATE AI RESPONSE (this is bot-only endpoint)
+                # ============================================
+                # STEP 1: Check if ANY escalation exists for this session
+                # ============================================
+                # On a cache miss, status and recent history come back in one round-trip
+                status_cached, escalation_status = await session_state_service.get_cached_escalation_status(session_uuid)
+                if not status_cached:
+                    escalation_status, history = await chat_service.fetch_turn_context(db, session_uuid)
+                    await session_state_service.set_escalation_status(session_uuid, escalation_status)
+                    recent_window = manager.seed_history_window(session_id, history)
+
+                # The current message is not stored yet
+                if recent_window is not None:
+                    recent_window.append(chat_message)
+
+                # ============================================
+                # STEP 2: If escalation exists and pending, check for user response
+                # ============================================
+                if escalation_status == EscalationDecision.PENDING:
+                    # Check for acceptance
+                    if _ACCEPT_RE.search(content_lower):
+                        logger.info("✅ User ACCEPTED escalation for session %s", session_id)
+                        # The answer is the message just received; reuse its timestamp
+                        await _record_escalation_answer(db, session_uuid, EscalationDecision.ACCEPTED, chat_message.created_at)
+                        db.add_all(pending_rows)
+                        pending_rows = []
+                        await db.commit()
+                        await session_state_service.set_escalation_status(session_uuid, EscalationDecision.ACCEPTED)
+
+                        # Send acceptance confirmation
+                        writer.send(_ACCEPTED_TEMPLATE.replace(_SID_PLACEHOLDER, session_id, 1))
+                        continue  # Don't generate AI response
+
+                    # Check for decline
+                    elif _DECLINE_RE.search(content_lower):
+                        logger.info("❌ User DECLINED escalation for session %s", session_id)
+                        # Stored together with the AI reply below (one commit per turn)
+                        pending_decline_at = chat_message.created_at
+                        # Continue to AI response below
+
+                # ============================================
+                # STEP 3: IMMEDIATE INTENT CHECK (if no escalation exists yet)
+                # ============================================
+                if escalation_status is None:
                     # 🚨 CRITICAL: Check for direct escalation intent FIRST
-                    intent_detected = chat_health_service.has_direct_escalation_intent(message_create.content)
-                    
+                    intent_detected = chat_health_service.has_direct_escalation_intent(content, content_lower)
+
                     if intent_detected:
-                        logger.warning(f"🚨" * 30)
-                        logger.warning(f"🚨 ESCALATION INTENT DETECTED - STOPPING AI RESPONSE 🚨")
-                        logger.warning(f"🚨 Session: {session_id}")
-                        logger.warning(f"🚨 Message: '{message_create.content}'")
-                        logger.warning(f"🚨" * 30)
-                        
                         # Create escalation record
-                        new_escalation = ChatEscalation(
-                            session_id=UUID(session_id),
-                            reason="user_request",
-                            user_accepted="pending"
-                        )
-                        db.add(new_escalation)
-                        db.commit()
-                        db.refresh(new_escalation)
-                        logger.warning(f"✅ Escalation record created: ID={new_escalation.id}")
-                        
+                        await _open_escalation(db, session_uuid, "user_request")
+                        db.add_all(pending_rows)
+                        pending_rows = []
+                        await db.commit()
+                        await session_state_service.set_escalation_status(session_uuid, EscalationDecision.PENDING)
+
                         # Send SYSTEM_SUGGESTION immediately
-                        system_message = {
-                            "type": "SYSTEM_SUGGESTION",
-                            "session_id": session_id,
-                            "message": "I understand you'd like to speak with a therapist. Would you like me to book an appointment for you right away?",
-                            "reason": "user_request"
-                        }
-                        logger.warning(f"📤 Sending SYSTEM_SUGGESTION to user in session {session_id}")
-                        await websocket.send_json(system_message)
-                        logger.warning(f"✅ SYSTEM_SUGGESTION sent to user")
-                        
+                        writer.send(_suggestion_frame("user_request", session_id))
+
                         # 🛑 CRITICAL: STOP EXECUTION - Do NOT continue to AI response
-                        logger.warning(f"🛑 RETURNING NOW - NO AI RESPONSE WILL BE GENERATED 🛑")
-                        logger.warning(f"=" * 80)
                         continue  # THIS SKIPS THE AI RESPONSE GENERATION BELOW
-                    
-                    logger.info(f"✅ No direct intent detected, checking chat health...")
-                    
+
                     # Check for chat health issues (AI looping, emotions, etc.)
-                    logger.info(f"No direct intent detected, checking chat health...")
-                    recent_messages = chat_service.get_chat_history(db, UUID(session_id), limit=10)
-                    
-                    if chat_health_service.should_trigger_escalation(recent_messages, False):
-                        health_result = chat_health_service.evaluate_chat_health(recent_messages)
-                        logger.warning(f"Chat health issue detected: {health_result['reason']}")
-                        
+                    if recent_window is None:
+                        _, history = await chat_service.fetch_turn_context(db, session_uuid)
+                        recent_window = manager.seed_history_window(session_id, [*history, chat_message])
+                    recent_messages = list(recent_window)
+
+                    # Keyword/counter checks over at most 10 rows: cheaper inline than a
+                    # thread hop, so only the (optional) emotion model is offloaded
+                    health_result = chat_health_service.evaluate_chat_health(recent_messages)
+                    if health_result["struggling"]:
                         # Create escalation record
-                        new_escalation = ChatEscalation(
-                            session_id=UUID(session_id),
-                            reason=health_result["reason"],
-                            user_accepted="pending"
-                        )
-                        db.add(new_escalation)
-                        db.commit()
-                        
+                        await _open_escalation(db, session_uuid, health_result["reason"])
+                        db.add_all(pending_rows)
+                        pending_rows = []
+                        await db.commit()
+                        await session_state_service.set_escalation_status(session_uuid, EscalationDecision.PENDING)
+
                         # Send SYSTEM_SUGGESTION
-                        system_message = {
-                            "type": "SYSTEM_SUGGESTION",
-                            "session_id": session_id,
-                            "message": "I want to make sure you get the best support. It might help to talk with a professional therapist. Would you like me to book an appointment for you?",
-                            "reason": health_result["reason"]
-                        }
-                        await websocket.send_json(system_message)
-                        
+                        writer.send(_suggestion_frame(health_result["reason"], session_id))
+
                         # 🛑 STOP HERE - Do NOT generate AI response
                         continue
-            
-            # ============================================
-            # STEP 4: Generate normal AI response
-            # ============================================
-            # Only reach here if no escalation was triggered
-            logger.info(f"=" * 80)
-            logger.info(f"💬 GENERATING NORMAL AI RESPONSE")
-            logger.info(f"Session: {session_id}")
-            logger.info(f"User message: '{message_create.content[:50]}...'")
-            logger.info(f"=" * 80)
-            
-            # Send typing indicator to user
-            await websocket.send_json({
-                "type": "typing",
-                "sender": "ai",
-                "is_typing": True
-            })
-            
-            # Generate AI response (with Gemini AI)
-            ai_response_content = chat_service.get_ai_response(
-                message_create.content,
-                session_id=UUID(session_id),
-                db=db
-            )
-            logger.info(f"AI response generated: '{ai_response_content[:100]}...'")
-            
-            # 🚨 CRITICAL: Check if Gemini wants to escalate
-            if "<<ESCALATE>>" in ai_response_content:
-                logger.warning(f"=" * 80)
-                logger.warning(f"🚨 GEMINI AI DETECTED ESCALATION NEED 🚨")
-                logger.warning(f"Session: {session_id}")
-                logger.warning(f"Gemini said: {ai_response_content}")
-                logger.warning(f"=" * 80)
-                
-                # Stop typing indicator
-                await websocket.send_json({
-                    "type": "typing",
-                    "sender": "ai",
-                    "is_typing": False
-                })
-                
-                # Create escalation record
-                gemini_escalation = ChatEscalation(
-                    session_id=UUID(session_id),
-                    reason="gemini_detected",
-                    user_accepted="pending"
-                )
-                db.add(gemini_escalation)
-                db.commit()
-                logger.warning(f"✅ Created Gemini escalation record ID: {gemini_escalation.id}")
-                
-                # Send SYSTEM_SUGGESTION
-                system_message = {
-                    "type": "SYSTEM_SUGGESTION",
-                    "session_id": session_id,
-                    "message": "I can help you connect with a therapist. Would you like me to book an appointment for you?",
-                    "reason": "gemini_detected"
-                }
-                logger.warning(f"📤 Sending SYSTEM_SUGGESTION (Gemini escalation)")
-                await websocket.send_json(system_message)
-                logger.warning(f"🛑 SKIPPING AI RESPONSE - Gemini triggered escalation")
-                continue  # Skip sending the <<ESCALATE>> token as a message
-            
-            # Stop typing indicator
-            await websocket.send_json({
-                "type": "typing",
-                "sender": "ai",
-                "is_typing": False
-            })
-            
-            # Create AI message
-            ai_message_create = ChatMessageCreate(
-                session_id=UUID(session_id),
-                sender_type=SenderType.AI,
-                content=ai_response_content,
-                visitor_id=None
-            )
-            
-            ai_message = chat_service.create_message(db, ai_message_create)
-            
-            # Send AI response to user
-            ai_message_response = {
-                "type": "message",
-                "id": str(ai_message.id),
-                "session_id": str(ai_message.session_id),
-                "sender": "ai",
-                "content": ai_message.content,
-                "emotion": ai_message.emotion,
-                "confidence": ai_message.confidence,
-                "created_at": ai_message.created_at.isoformat()
-            }
-            
-            await websocket.send_json(ai_message_response)
-            logger.info(f"✅ AI response sent to user")
+
+                # ============================================
+                # STEP 4: Generate normal AI response
+                # ============================================
+                # Only reach here if no escalation was triggered
+                logger.debug("💬 Generating AI response for session %s", session_id)
+
+                # End the read transaction so no connection is held across the model call
+                # (the user message is still pending and goes in with the AI reply)
+                await db.commit()
+
+                # Typing indicator
+                writer.send(_AI_TYPING_START)
+
+                # Stream AI response (with Gemini AI); chunks carry the id the
+                # final stored message is sent under, so the client can replace them
+                ai_message_id = uuid7()
+                ai_response_content = ""
+                sent_length = 0
+                escalate = False
+                # Model context comes from the in-memory window (minus this message,
+                # its last entry) when seeded; otherwise it is read from the database
+                async with aclosing(chat_service.stream_ai_response(
+                    content,
+                    session_id=session_uuid,
+                    db=db,
+                    recent_messages=list(recent_window)[:-1] if recent_window is not None else None
+                )) as ai_chunks:
+                    async for chunk in ai_chunks:
+                        # Only the new chunk (plus a possible token prefix before it) can complete the token
+                        search_from = max(0, len(ai_response_content) - len(_ESCALATE_TOKEN) + 1)
+                        ai_response_content += chunk
+                        if ai_response_content.find(_ESCALATE_TOKEN, search_from) != -1:
+                            escalate = True
+                            break  # Closing the stream stops generation
+
+                        # Hold back a trailing partial "<<ESCALATE" until the next chunk
+                        visible_length = len(ai_response_content) - _partial_token_length(ai_response_content)
+                        if visible_length > sent_length:
+                            writer.send(dumps({
+                                "type": "message_chunk",
+                                "id": ai_message_id,
+                                "session_id": session_uuid,
+                                "sender": "ai",
+                                "content": ai_response_content[sent_length:visible_length]
+                            }))
+                            sent_length = visible_length
+                logger.debug("AI response generated: '%.100s...'", ai_response_content)
+
+                # All of this turn's writes (user message, decline, escalation or
+                # AI message) go into the database in a single commit
+                escalation_id = None
+                ai_rows = []
+                if pending_decline_at is not None:
+                    await _record_escalation_answer(db, session_uuid, EscalationDecision.DECLINED, pending_decline_at)
+
+                # 🚨 CRITICAL: Check if Gemini wants to escalate
+                if escalate:
+                    logger.debug("Gemini said: %s", ai_response_content)
+                    escalation_id = await _open_escalation(db, session_uuid, "gemini_detected")
+                elif ai_response_content.strip():
+                    # Create AI message (empty reply: AI disabled for this session, store only the user message)
+                    ai_rows = await chat_service.build_message_fast(
+                        session_uuid, SenderType.AI, ai_response_content, message_id=ai_message_id
+                    )
+
+                # User and AI messages go into chat_messages in one batched INSERT
+                db.add_all(pending_rows + ai_rows)
+                pending_rows = []
+                await db.commit()
+
+                if pending_decline_at is not None:
+                    pending_decline_at = None
+                    await session_state_service.set_escalation_status(session_uuid, EscalationDecision.DECLINED)
+                if escalation_id is not None:
+                    await session_state_service.set_escalation_status(session_uuid, EscalationDecision.PENDING)
+
+                if escalate:
+                    # The reply is not stored: withdraw any part of it already streamed
+                    if sent_length:
+                        writer.send(dumps({
+                            "type": "message_chunk",
+                            "id": ai_message_id,
+                            "session_id": session_uuid,
+                            "sender": "ai",
+                            "content": "",
+                            "discard": True
+                        }))
+                    # Stop typing indicator and send SYSTEM_SUGGESTION
+                    writer.send(_AI_TYPING_STOP, _suggestion_frame("gemini_detected", session_id))
+                    continue  # Skip sending the <<ESCALATE>> token as a message
+
+                if not ai_rows:
+                    writer.send(_AI_TYPING_STOP)
+                    continue
+
+                ai_message = ai_rows[0]
+                if recent_window is not None:
+                    recent_window.append(ai_message)
+
+                # Stop typing indicator and send the stored AI response (replaces the streamed chunks)
+                writer.send(_AI_TYPING_STOP, dumps(_message_frame(ai_message)))
+
+        logger.info("🔌 USER-CHAT: User disconnected from session %s", session_id)
     
     except WebSocketDisconnect:
-        logger.warning(f"🔌 USER-CHAT: User disconnected from session {session_id}")
+        # Client went away while a frame was being sent
+        logger.info("🔌 USER-CHAT: User disconnected from session %s", session_id)
     
     except Exception as e:
-        logger.error(f"❌ USER-CHAT: Error in session {session_id}: {e}")
+        logger.error("❌ USER-CHAT: Error in session %s: %s", session_id, e)
+    
+    finally:
+        manager.disconnect(session_id, websocket)
+        manager.release_turn_lock(session_id)
+        await writer.close()
+        
+        if pending_rows:
+            # Connection ended mid-turn; keep the user's message (and a decline it carried)
+            try:
+                async with AsyncSessionLocal() as db:
+                    if pending_decline_at is not None:
+                        await _record_escalation_answer(db, session_uuid, EscalationDecision.DECLINED, pending_decline_at)
+                    db.add_all(pending_rows)
+                    await db.commit()
+            except Exception as e:
+                logger.error("❌ USER-CHAT: Could not store pending message for session %s: %s", session_id, e)
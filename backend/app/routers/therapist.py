@@ -1,24 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, lambda_stmt, select
+from typing import AsyncIterator, List
 from uuid import UUID
 
-from app.db.session import get_db
+from app.db.session import AsyncSessionLocal, get_db
 from app.schemas.therapist import TherapistNoteCreate, TherapistNoteResponse
-from app.schemas.analytics import EmotionTrend
-from app.schemas.escalation import EscalationResponse
+from app.schemas.analytics import EmotionTrend, EmotionTrendListAdapter
+from app.schemas.escalation import EscalationResponse, EscalationListAdapter
 from app.models.therapist_note import TherapistNote
 from app.models.chat_escalation import ChatEscalation
 from app.services.analytics_service import analytics_service
+from app.services.escalation_loader_service import escalation_loader_service
 from app.core.logging import logger
+from app.core.serialization import dumps, json_response
 
 router = APIRouter(prefix="/api/therapist", tags=["therapist"])
 
 
 @router.post("/notes", response_model=TherapistNoteResponse)
-def create_note(
+async def create_note(
     note_data: TherapistNoteCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a private therapist note for an appointment.
@@ -31,44 +35,94 @@ def create_note(
         )
         
         db.add(note)
-        db.commit()
-        db.refresh(note)
+        await db.commit()  # Server defaults come back via INSERT ... RETURNING
         
-        logger.info(f"Created therapist note for appointment {note_data.appointment_id}")
+        logger.info("Created therapist note for appointment %s", note_data.appointment_id)
         return note
     
     except Exception as e:
-        logger.error(f"Error creating therapist note: {e}")
+        logger.error("Error creating therapist note: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/notes/appointment/{appointment_id}", response_model=List[TherapistNoteResponse])
-def get_appointment_notes(
-    appointment_id: UUID,
-    db: Session = Depends(get_db)
+@router.post("/notes/bulk")
+async def create_notes(
+    notes: List[TherapistNoteCreate] = Body(..., min_length=1, max_length=500),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get all therapist notes for a specific appointment.
+    Create several private therapist notes in one transaction.
+    Rows are sent as one multi-row INSERT; nothing is read back.
     """
-    notes = db.query(TherapistNote)\
-        .filter(TherapistNote.appointment_id == appointment_id)\
-        .order_by(TherapistNote.created_at.desc())\
-        .all()
+    try:
+        await db.execute(
+            insert(TherapistNote),
+            [{"appointment_id": note.appointment_id, "note": note.note} for note in notes]
+        )
+        await db.commit()
+        
+        logger.info("Created %d therapist notes", len(notes))
+        return {"inserted": len(notes)}
     
-    return notes
+    except Exception as e:
+        logger.error("Error creating therapist notes: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Rows fetched (and written to the response) per chunk when streaming notes
+_NOTES_STREAM_CHUNK = 200
+
+
+async def _stream_notes(appointment_id: UUID) -> AsyncIterator[bytes]:
+    """
+    Encode an appointment's notes as a JSON array, one chunk per batch of rows.
+    Uses its own session: a get_db session is closed before a streamed body is sent.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(lambda_stmt(
+            lambda: select(
+                TherapistNote.id,
+                TherapistNote.appointment_id,
+                TherapistNote.note,
+                TherapistNote.created_at,
+                TherapistNote.updated_at
+            )
+            .where(TherapistNote.appointment_id == appointment_id)
+            .order_by(TherapistNote.created_at.desc())),
+            # Passed here: inside the lambda the value would become a bound parameter
+            execution_options={"yield_per": _NOTES_STREAM_CHUNK}
+        )
+        
+        separator = b"["
+        async for rows in result.mappings().partitions():
+            yield separator + b",".join(dumps(dict(row)).encode() for row in rows)
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
 
 
-@router.get("/emotion-timeline/{session_id}", response_model=List[EmotionTrend])
-def get_session_emotion_timeline(
-    session_id: str,
-    db: Session = Depends(get_db)
+@router.get("/notes/appointment/{appointment_id}", responses={200: {"model": List[TherapistNoteResponse]}})
+async def get_appointment_notes(appointment_id: UUID):
+    """
+    Get all therapist notes for a specific appointment.
+    Streamed in chunks, so memory stays bounded however many notes there are.
+    """
+    return StreamingResponse(_stream_notes(appointment_id), media_type="application/json")
+
+
+# Read-only list endpoints build trusted rows with model_construct and encode
+# them with a prebuilt TypeAdapter, skipping response_model validation; the
+# schemas are still declared in `responses` for the OpenAPI docs.
+@router.get("/emotion-timeline/{session_id}", responses={200: {"model": List[EmotionTrend]}})
+async def get_session_emotion_timeline(
+    session_id: UUID,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get emotion timeline for a specific chat session.
     Used for therapist dashboard visualization.
     """
-    timeline = analytics_service.get_session_emotion_timeline(db, session_id)
-    return timeline
+    timeline = await analytics_service.get_session_emotion_timeline(db, session_id)
+    return json_response(EmotionTrendListAdapter.dump_json(timeline))
 
 
 @router.get("/active-sessions")
@@ -76,15 +130,11 @@ def get_active_sessions():
     """
     Get list of currently active chat sessions.
     Used for therapist to see which sessions they can join.
+    Dashboards poll this; the encoded body is reused until the set of sessions changes.
     """
     from app.websocket.connection_manager import manager
     
-    active_sessions = manager.get_active_sessions()
-    
-    return {
-        "active_sessions": active_sessions,
-        "count": len(active_sessions)
-    }
+    return Response(manager.active_sessions_body(), media_type="application/json")
 
 
 @router.get("/session/{session_id}/participants")
@@ -104,33 +154,45 @@ def get_session_participants(
     }
 
 
-@router.get("/escalations", response_model=List[EscalationResponse])
-def get_all_escalations(
-    db: Session = Depends(get_db)
+# Fixed query (no parameters), built once at import
+_RECENT_ESCALATIONS = (
+    select(ChatEscalation)
+    .order_by(ChatEscalation.triggered_at.desc())
+    .limit(100)
+)
+
+
+@router.get("/escalations", responses={200: {"model": List[EscalationResponse]}})
+async def get_all_escalations(
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get all chat escalations for therapist visibility.
     Shows which sessions needed professional intervention.
     """
-    escalations = db.query(ChatEscalation)\
-        .order_by(ChatEscalation.triggered_at.desc())\
-        .limit(100)\
-        .all()
+    result = await db.scalars(_RECENT_ESCALATIONS)
     
-    return escalations
+    return json_response(EscalationListAdapter.dump_json([
+        EscalationResponse.model_construct(
+            id=escalation.id,
+            session_id=escalation.session_id,
+            reason=escalation.reason,
+            user_accepted=escalation.user_accepted,
+            appointment_id=escalation.appointment_id,
+            triggered_at=escalation.triggered_at,
+            resolved_at=escalation.resolved_at
+        )
+        for escalation in result.all()
+    ]))
 
 
 @router.get("/escalations/session/{session_id}", response_model=EscalationResponse)
-def get_session_escalation(
-    session_id: str,
-    db: Session = Depends(get_db)
-):
+async def get_session_escalation(session_id: UUID):
     """
     Get escalation details for a specific session.
+    Concurrent lookups are batched into one query (see escalation_loader_service).
     """
-    escalation = db.query(ChatEscalation)\
-        .filter(ChatEscalation.session_id == UUID(session_id))\
-        .first()
+    escalation = await escalation_loader_service.load(session_id)
     
     if not escalation:
         raise HTTPException(status_code=404, detail="No escalation found for this session")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Dict
 from datetime import datetime
 
@@ -11,6 +11,10 @@ class EmotionTrend(BaseModel):
     session_id: str
 
 
+# Built once and reused to encode list responses
+EmotionTrendListAdapter = TypeAdapter(List[EmotionTrend])
+
+
 class SessionStats(BaseModel):
     """Statistics for a single session"""
     session_id: str
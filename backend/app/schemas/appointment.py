@@ -1,8 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
 from app.models.appointment import AppointmentStatus
+from app.schemas.visitor import VisitorResponse
 
 
 class AppointmentCreate(BaseModel):
@@ -25,9 +26,15 @@ class AppointmentResponse(BaseModel):
     start_time: datetime
     end_time: Optional[datetime]
     status: AppointmentStatus
-    visitor_name: Optional[str] = None
+    visitor: Optional[VisitorResponse] = Field(None, exclude=True)  # Eager-loaded relationship
     created_at: datetime
     updated_at: datetime
 
+    @computed_field
+    @property
+    def visitor_name(self) -> Optional[str]:
+        """Display name of the linked visitor"""
+        return self.visitor.name if self.visitor else None
+
     class Config:
         from_attributes = True
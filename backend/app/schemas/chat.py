@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Optional, TypedDict
 from datetime import datetime
 from uuid import UUID
 from app.models.chat import SenderType
@@ -12,11 +12,15 @@ class EmotionAnalysis(BaseModel):
     timestamp: datetime
 
 
+# Longest accepted chat message (also enforced by the user-chat WebSocket)
+MESSAGE_MAX_LENGTH = 5000
+
+
 class ChatMessageCreate(BaseModel):
     """Schema for creating a chat message"""
     session_id: UUID
     sender_type: SenderType
-    content: str = Field(..., min_length=1, max_length=5000)
+    content: str = Field(..., min_length=1, max_length=MESSAGE_MAX_LENGTH)
     visitor_id: Optional[UUID] = None
 
 
@@ -28,14 +32,30 @@ class ChatMessageResponse(BaseModel):
     content: str
     emotion: Optional[str]
     confidence: Optional[float]
-    is_read: str
+    is_read: bool
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+# Built once and reused to encode list responses
+ChatMessageListAdapter = TypeAdapter(List[ChatMessageResponse])
+
+
 class ChatHistoryRequest(BaseModel):
     """Schema for requesting chat history"""
     session_id: UUID
     limit: int = Field(default=100, ge=1, le=500)
+
+
+class MessageFrame(TypedDict):
+    """WebSocket frame carrying a chat message (encoded with orjson)"""
+    type: str
+    id: UUID
+    session_id: UUID
+    sender: str
+    content: str
+    emotion: Optional[str]
+    confidence: Optional[float]
+    created_at: datetime
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
+from app.models.chat_escalation import EscalationDecision
 
 
 class EscalationCreate(BaseModel):
@@ -15,7 +16,7 @@ class EscalationResponse(BaseModel):
     id: UUID
     session_id: UUID
     reason: str
-    user_accepted: str
+    user_accepted: EscalationDecision
     appointment_id: Optional[UUID]
     triggered_at: datetime
     resolved_at: Optional[datetime]
@@ -24,6 +25,10 @@ class EscalationResponse(BaseModel):
         from_attributes = True
 
 
+# Built once and reused to encode list responses
+EscalationListAdapter = TypeAdapter(List[EscalationResponse])
+
+
 class AutoBookRequest(BaseModel):
     """Schema for auto-booking appointment"""
     session_id: UUID
@@ -1,7 +1,8 @@
-from typing import List, Dict
-from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, distinct, lambda_stmt, literal_column
+from datetime import date, datetime, time, timedelta, timezone
 from collections import Counter
 
 from app.models.chat import ChatMessage
@@ -16,8 +17,29 @@ class AnalyticsService:
     Provides statistics on sessions, emotions, and appointments.
     """
     
+    # Finished UTC day -> (distinct sessions, emotion counts); see _get_daily_rollups
+    _closed_days: Dict[date, Tuple[int, Counter]] = {}
+    _CLOSED_DAYS_KEPT = 400
+    
+    # Messages are stamped when a turn is built but committed when it ends,
+    # so a day is only treated as finished this long after its midnight
+    _CLOSE_GRACE = timedelta(minutes=10)
+    
+    # Inlined rather than bound, so the date expression in SELECT and
+    # GROUP BY is the same SQL text
+    _UTC_ZONE = literal_column("'UTC'")
+    
+    # Columns an EmotionTrend is built from (rows, not ORM objects; the
+    # stored message excerpt is never loaded)
+    _TREND_COLUMNS = (
+        EmotionData.created_at,
+        EmotionData.emotion,
+        EmotionData.confidence,
+        EmotionData.session_id
+    )
+    
     @staticmethod
-    def get_analytics_summary(db: Session, days: int = 30) -> AnalyticsSummary:
+    async def get_analytics_summary(db: AsyncSession, days: int = 30) -> AnalyticsSummary:
         """
         Generate comprehensive analytics summary.
         
@@ -28,34 +50,39 @@ class AnalyticsService:
         Returns:
             AnalyticsSummary with various metrics
         """
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         
-        # Total sessions (unique session IDs)
-        total_sessions = db.query(func.count(distinct(ChatMessage.session_id)))\
-            .filter(ChatMessage.created_at >= cutoff_date)\
-            .scalar() or 0
-        
-        # Total messages
-        total_messages = db.query(func.count(ChatMessage.id))\
-            .filter(ChatMessage.created_at >= cutoff_date)\
-            .scalar() or 0
-        
-        # Sessions per day
-        sessions_per_day = AnalyticsService._get_sessions_per_day(db, cutoff_date)
+        # Total sessions (unique session IDs) and total messages, in one scan:
+        # grouping by session_id plans better than count(DISTINCT ...), which
+        # always sorts, and the per-session counts add up to the message total
+        per_session = (
+            select(func.count(ChatMessage.id).label('messages'))
+            .where(ChatMessage.created_at >= cutoff_date)
+            .group_by(ChatMessage.session_id)
+            .subquery()
+        )
+        totals = (await db.execute(
+            select(func.count(), func.sum(per_session.c.messages))
+        )).one()
+        total_sessions, total_messages = totals[0] or 0, int(totals[1] or 0)
         
-        # Emotion distribution
-        emotion_distribution = AnalyticsService._get_emotion_distribution(db, cutoff_date)
+        # Sessions per day and emotion distribution, from daily rollups
+        # (whole UTC days, starting with the day the period begins)
+        rollups = await AnalyticsService._get_daily_rollups(db, cutoff_date.date())
+        sessions_per_day = {str(day): count for day, (count, _) in rollups.items() if count}
+        emotion_distribution = dict(sum((emotions for _, emotions in rollups.values()), Counter()))
         
         # Average chat duration
-        avg_duration = AnalyticsService._get_average_chat_duration(db, cutoff_date)
+        avg_duration = await AnalyticsService._get_average_chat_duration(db, cutoff_date)
         
         # Appointment completion rate
-        completion_rate = AnalyticsService._get_appointment_completion_rate(db, cutoff_date)
+        completion_rate = await AnalyticsService._get_appointment_completion_rate(db, cutoff_date)
         
         # Recent emotion trends
-        emotion_trends = AnalyticsService._get_recent_emotion_trends(db, limit=100)
+        emotion_trends = await AnalyticsService._get_recent_emotion_trends(db, limit=100)
         
-        return AnalyticsSummary(
+        # Every value was computed above from the database; skip re-validation
+        return AnalyticsSummary.model_construct(
             total_sessions=total_sessions,
             total_messages=total_messages,
             sessions_per_day=sessions_per_day,
@@ -66,108 +93,163 @@ class AnalyticsService:
         )
     
     @staticmethod
-    def _get_sessions_per_day(db: Session, cutoff_date: datetime) -> Dict[str, int]:
-        """Get session count grouped by day"""
-        results = db.query(
-            func.date(ChatMessage.created_at).label('date'),
-            func.count(distinct(ChatMessage.session_id)).label('count')
-        ).filter(
-            ChatMessage.created_at >= cutoff_date
-        ).group_by(
-            func.date(ChatMessage.created_at)
-        ).all()
+    async def _get_daily_rollups(db: AsyncSession, first_day: date) -> Dict[date, Tuple[int, Counter]]:
+        """
+        Get per-day session counts and emotion counts from first_day through today (UTC).
+        Finished days no longer change, so each is aggregated once per worker
+        and kept in _closed_days; days still within _CLOSE_GRACE of their end
+        (yesterday, just after midnight) and today are queried on every call.
+        """
+        now = datetime.now(timezone.utc)
+        today = now.date()
+        settled = (now - AnalyticsService._CLOSE_GRACE).date()
+        cache = AnalyticsService._closed_days
+        
+        closed_days = [first_day + timedelta(days=offset) for offset in range((settled - first_day).days)]
+        missing = [day for day in closed_days if day not in cache]
+        if missing:
+            # Aggregate the oldest missing day up to the settled midnight in one pass
+            closed = await AnalyticsService._aggregate_days(db, missing[0], settled)
+            for offset in range((settled - missing[0]).days):
+                day = missing[0] + timedelta(days=offset)
+                cache[day] = closed.get(day, (0, Counter()))
+            
+            # Keep a bounded history (dashboards look back a few months at most)
+            horizon = min(first_day, today - timedelta(days=AnalyticsService._CLOSED_DAYS_KEPT))
+            for day in [day for day in cache if day < horizon]:
+                del cache[day]
         
-        return {str(row.date): row.count for row in results}
+        rollups = {day: cache[day] for day in closed_days}
+        live_start = max(first_day, settled)
+        live = await AnalyticsService._aggregate_days(db, live_start, None)
+        for offset in range((today - live_start).days + 1):
+            day = live_start + timedelta(days=offset)
+            rollups[day] = live.get(day, (0, Counter()))
+        return rollups
     
     @staticmethod
-    def _get_emotion_distribution(db: Session, cutoff_date: datetime) -> Dict[str, int]:
-        """Get emotion count distribution"""
-        results = db.query(
+    async def _aggregate_days(db: AsyncSession, start: date, end: Optional[date]) -> Dict[date, Tuple[int, Counter]]:
+        """Distinct sessions and emotion counts per day for [start, end) (end=None: open-ended)"""
+        start_at = datetime.combine(start, time.min, tzinfo=timezone.utc)
+        # Bucket by the UTC date to match the UTC midnights above, whatever
+        # the database session's TimeZone is
+        message_day = func.date(func.timezone(AnalyticsService._UTC_ZONE, ChatMessage.created_at))
+        emotion_day = func.date(func.timezone(AnalyticsService._UTC_ZONE, EmotionData.created_at))
+        
+        sessions_query = select(
+            message_day.label('date'),
+            func.count(distinct(ChatMessage.session_id)).label('count')
+        ).where(ChatMessage.created_at >= start_at)
+        emotions_query = select(
+            emotion_day.label('date'),
             EmotionData.emotion,
             func.count(EmotionData.id).label('count')
-        ).filter(
-            EmotionData.created_at >= cutoff_date
-        ).group_by(
-            EmotionData.emotion
-        ).all()
+        ).where(EmotionData.created_at >= start_at)
+        if end is not None:
+            end_at = datetime.combine(end, time.min, tzinfo=timezone.utc)
+            sessions_query = sessions_query.where(ChatMessage.created_at < end_at)
+            emotions_query = emotions_query.where(EmotionData.created_at < end_at)
         
-        return {row.emotion: row.count for row in results}
+        days: Dict[date, Tuple[int, Counter]] = {}
+        for row in await db.execute(sessions_query.group_by(message_day)):
+            days[AnalyticsService._as_date(row.date)] = (row.count, Counter())
+        for row in await db.execute(emotions_query.group_by(emotion_day, EmotionData.emotion)):
+            day = AnalyticsService._as_date(row.date)
+            days.setdefault(day, (0, Counter()))[1][row.emotion] += row.count
+        return days
     
     @staticmethod
-    def _get_average_chat_duration(db: Session, cutoff_date: datetime) -> float:
+    def _as_date(value) -> date:
+        """date() comes back as a date (PostgreSQL) or an ISO string (SQLite)"""
+        return value if isinstance(value, date) else date.fromisoformat(str(value))
+    
+    @staticmethod
+    async def _get_average_chat_duration(db: AsyncSession, cutoff_date: datetime) -> float:
         """Calculate average chat session duration in minutes"""
-        # Get all unique sessions
-        sessions = db.query(distinct(ChatMessage.session_id))\
-            .filter(ChatMessage.created_at >= cutoff_date)\
-            .all()
-        
-        if not sessions:
-            return 0.0
+        # First/last message time of every session active since the cutoff
+        # (sessions with fewer than 2 messages have no duration)
+        active_sessions = (
+            select(ChatMessage.session_id)
+            .where(ChatMessage.created_at >= cutoff_date)
+            .distinct()
+        )
+        spans = (
+            select(
+                func.min(ChatMessage.created_at).label('started_at'),
+                func.max(ChatMessage.created_at).label('ended_at')
+            )
+            .where(ChatMessage.session_id.in_(active_sessions))
+            .group_by(ChatMessage.session_id)
+            .having(func.count(ChatMessage.id) >= 2)
+            .subquery()
+        )
         
-        durations = []
-        for (session_id,) in sessions:
-            messages = db.query(ChatMessage)\
-                .filter(ChatMessage.session_id == session_id)\
-                .order_by(ChatMessage.created_at)\
-                .all()
-            
-            if len(messages) >= 2:
-                duration = (messages[-1].created_at - messages[0].created_at).total_seconds() / 60
-                durations.append(duration)
+        # Averaged in the database: one row back instead of every message
+        avg_seconds = await db.scalar(
+            select(func.avg(
+                func.extract('epoch', spans.c.ended_at) - func.extract('epoch', spans.c.started_at)
+            ))
+        )
         
-        return round(sum(durations) / len(durations), 2) if durations else 0.0
+        return round(float(avg_seconds) / 60, 2) if avg_seconds is not None else 0.0
     
     @staticmethod
-    def _get_appointment_completion_rate(db: Session, cutoff_date: datetime) -> float:
+    async def _get_appointment_completion_rate(db: AsyncSession, cutoff_date: datetime) -> float:
         """Calculate appointment completion rate as percentage"""
-        total = db.query(func.count(Appointment.id))\
-            .filter(Appointment.created_at >= cutoff_date)\
-            .scalar() or 0
+        # Both counts from one scan (aggregate FILTER for the completed ones)
+        counts = (await db.execute(
+            select(
+                func.count(Appointment.id),
+                func.count(Appointment.id).filter(Appointment.status == AppointmentStatus.COMPLETED)
+            )
+            .where(Appointment.created_at >= cutoff_date)
+        )).one()
+        total, completed = counts[0] or 0, counts[1] or 0
         
         if total == 0:
             return 0.0
         
-        completed = db.query(func.count(Appointment.id))\
-            .filter(
-                Appointment.created_at >= cutoff_date,
-                Appointment.status == AppointmentStatus.COMPLETED
-            ).scalar() or 0
-        
         return round((completed / total) * 100, 2)
     
     @staticmethod
-    def _get_recent_emotion_trends(db: Session, limit: int = 100) -> List[EmotionTrend]:
+    async def _get_recent_emotion_trends(db: AsyncSession, limit: int = 100) -> List[EmotionTrend]:
         """Get recent emotion trends for visualization"""
-        emotion_data = db.query(EmotionData)\
-            .order_by(EmotionData.created_at.desc())\
-            .limit(limit)\
-            .all()
+        result = await db.execute(
+            select(*AnalyticsService._TREND_COLUMNS)
+            .order_by(EmotionData.created_at.desc())
+            .limit(limit)
+        )
+        emotion_data = result.all()
         
-        trends = [
-            EmotionTrend(
+        # Rows come from the database, so the models are built without validation;
+        # newest-first rows are walked backwards for chronological order
+        return [
+            EmotionTrend.model_construct(
                 timestamp=ed.created_at,
                 emotion=ed.emotion,
                 confidence=ed.confidence,
                 session_id=str(ed.session_id)
             )
-            for ed in emotion_data
+            for ed in reversed(emotion_data)
         ]
-        
-        return list(reversed(trends))  # Chronological order
     
     @staticmethod
-    def get_session_emotion_timeline(
-        db: Session,
-        session_id: str
+    async def get_session_emotion_timeline(
+        db: AsyncSession,
+        session_id: UUID
     ) -> List[EmotionTrend]:
         """Get emotion timeline for a specific session"""
-        emotion_data = db.query(EmotionData)\
-            .filter(EmotionData.session_id == session_id)\
-            .order_by(EmotionData.created_at)\
-            .all()
+        # Built and compiled once; session_id is the only bound parameter
+        result = await db.execute(lambda_stmt(
+            lambda: select(*AnalyticsService._TREND_COLUMNS)
+            .where(EmotionData.session_id == session_id)
+            .order_by(EmotionData.created_at)
+        ))
+        emotion_data = result.all()
         
+        # Rows come from the database, so the models are built without validation
         return [
-            EmotionTrend(
+            EmotionTrend.model_construct(
                 timestamp=ed.created_at,
                 emotion=ed.emotion,
                 confidence=ed.confidence,
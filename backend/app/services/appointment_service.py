@@ -1,8 +1,9 @@
 from typing import List, Optional
 from uuid import UUID, uuid4
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, desc, and_
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timezone
 
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.visitor import Visitor
@@ -17,8 +18,8 @@ class AppointmentService:
     """
     
     @staticmethod
-    def create_appointment(
-        db: Session,
+    async def create_appointment(
+        db: AsyncSession,
         appointment_data: AppointmentCreate
     ) -> Appointment:
         """
@@ -34,28 +35,27 @@ class AppointmentService:
         # Create or get visitor
         visitor = Visitor(name=appointment_data.visitor_name)
         db.add(visitor)
-        db.flush()  # Get visitor ID
+        await db.flush()  # Get visitor ID
         
         # Generate session ID for chat
         session_id = uuid4()
         
         # Create appointment
         appointment = Appointment(
-            visitor_id=visitor.id,
+            visitor=visitor,
             session_id=session_id,
             start_time=appointment_data.start_time,
             status=AppointmentStatus.SCHEDULED
         )
         
         db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
+        await db.commit()  # No refresh: eager_defaults populates timestamps and visitor stays loaded
         
-        logger.info(f"Created appointment {appointment.id} with session {session_id}")
+        logger.info("Created appointment %s with session %s", appointment.id, session_id)
         return appointment
     
     @staticmethod
-    def get_appointment(db: Session, appointment_id: UUID) -> Optional[Appointment]:
+    async def get_appointment(db: AsyncSession, appointment_id: UUID) -> Optional[Appointment]:
         """
         Get appointment by ID.
         
@@ -66,13 +66,15 @@ class AppointmentService:
         Returns:
             Appointment instance or None
         """
-        return db.query(Appointment)\
-            .filter(Appointment.id == appointment_id)\
-            .first()
+        return await db.scalar(
+            select(Appointment)
+            .options(selectinload(Appointment.visitor))
+            .where(Appointment.id == appointment_id)
+        )
     
     @staticmethod
-    def get_all_appointments(
-        db: Session,
+    async def get_all_appointments(
+        db: AsyncSession,
         status: Optional[AppointmentStatus] = None,
         limit: int = 100
     ) -> List[Appointment]:
@@ -87,21 +89,20 @@ class AppointmentService:
         Returns:
             List of Appointment instances
         """
-        query = db.query(Appointment)
+        query = select(Appointment).options(selectinload(Appointment.visitor))
         
         if status:
-            query = query.filter(Appointment.status == status)
+            query = query.where(Appointment.status == status)
         
-        appointments = query\
-            .order_by(desc(Appointment.start_time))\
-            .limit(limit)\
-            .all()
+        result = await db.scalars(
+            query.order_by(desc(Appointment.start_time)).limit(limit)
+        )
         
-        return appointments
+        return list(result.all())
     
     @staticmethod
-    def update_appointment(
-        db: Session,
+    async def update_appointment(
+        db: AsyncSession,
         appointment_id: UUID,
         update_data: AppointmentUpdate
     ) -> Optional[Appointment]:
@@ -116,9 +117,11 @@ class AppointmentService:
         Returns:
             Updated Appointment instance or None
         """
-        appointment = db.query(Appointment)\
-            .filter(Appointment.id == appointment_id)\
-            .first()
+        appointment = await db.scalar(
+            select(Appointment)
+            .options(selectinload(Appointment.visitor))
+            .where(Appointment.id == appointment_id)
+        )
         
         if not appointment:
             return None
@@ -129,17 +132,14 @@ class AppointmentService:
         if update_data.end_time:
             appointment.end_time = update_data.end_time
         
-        appointment.updated_at = datetime.utcnow()
+        await db.commit()  # No refresh: keeps the eager-loaded visitor
         
-        db.commit()
-        db.refresh(appointment)
-        
-        logger.info(f"Updated appointment {appointment_id}")
+        logger.info("Updated appointment %s", appointment_id)
         return appointment
     
     @staticmethod
-    def get_upcoming_appointments(
-        db: Session,
+    async def get_upcoming_appointments(
+        db: AsyncSession,
         limit: int = 50
     ) -> List[Appointment]:
         """
@@ -152,24 +152,26 @@ class AppointmentService:
         Returns:
             List of upcoming Appointment instances
         """
-        now = datetime.utcnow()
+        now = datetime.now(timezone.utc)
         
-        appointments = db.query(Appointment)\
-            .filter(
+        result = await db.scalars(
+            select(Appointment)
+            .options(selectinload(Appointment.visitor))
+            .where(
                 and_(
                     Appointment.status == AppointmentStatus.SCHEDULED,
                     Appointment.start_time >= now
                 )
-            )\
-            .order_by(Appointment.start_time)\
-            .limit(limit)\
-            .all()
+            )
+            .order_by(Appointment.start_time)
+            .limit(limit)
+        )
         
-        return appointments
+        return list(result.all())
     
     @staticmethod
-    def get_appointment_by_session(
-        db: Session,
+    async def get_appointment_by_session(
+        db: AsyncSession,
         session_id: UUID
     ) -> Optional[Appointment]:
         """
@@ -182,9 +184,11 @@ class AppointmentService:
         Returns:
             Appointment instance or None
         """
-        return db.query(Appointment)\
-            .filter(Appointment.session_id == session_id)\
-            .first()
+        return await db.scalar(
+            select(Appointment)
+            .options(selectinload(Appointment.visitor))
+            .where(Appointment.session_id == session_id)
+        )
 
 
 appointment_service = AppointmentService()
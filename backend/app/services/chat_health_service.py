@@ -1,7 +1,24 @@
-from typing import List, Dict
+import re
+from functools import lru_cache
+from typing import List, Dict, Optional, Union
+from sqlalchemy import Row
 from app.models.chat import ChatMessage, SenderType
 from app.core.logging import logger
 
+# Messages as ORM objects or as column rows (see chat_service.fetch_turn_context);
+# only content, sender_type, emotion and confidence are read
+MessageLike = Union[ChatMessage, Row]
+
+
+def _keyword_alternation(keywords: List[str]) -> "re.Pattern[str]":
+    """
+    Compile keywords into one substring alternation.
+    Keywords that contain a shorter keyword ("need a therapist" vs "therapist")
+    can never change whether a text matches, so they are left out.
+    """
+    needed = [k for k in keywords if not any(other != k and other in k for other in keywords)]
+    return re.compile("|".join(re.escape(k) for k in needed))
+
 
 class ChatHealthService:
     """
@@ -10,7 +27,7 @@ class ChatHealthService:
     """
     
     # Emotions that indicate distress
-    NEGATIVE_EMOTIONS = ["sadness", "fear", "anger", "anxiety"]
+    NEGATIVE_EMOTIONS = frozenset({"sadness", "fear", "anger", "anxiety"})
     
     # AI confidence threshold below which we consider the bot ineffective
     LOW_CONFIDENCE_THRESHOLD = 0.55
@@ -40,8 +57,23 @@ class ChatHealthService:
         "talk to therapist"
     ]
     
+    # All keywords compiled into one alternation, so a message is scanned once
+    # instead of once per keyword (same substring semantics as `keyword in text`)
+    _INTENT_RE = _keyword_alternation(INTENT_KEYWORDS)
+    
+    # Messages up to this length have their result memoized (users repeat
+    # short phrasings); longer ones are always scanned
+    _INTENT_CACHE_MAX_LENGTH = 256
+    
     @staticmethod
-    def has_direct_escalation_intent(text: str) -> bool:
+    @lru_cache(maxsize=4096)
+    def _cached_intent_match(content_lower: str) -> Optional[str]:
+        """First intent keyword found in a short normalized message, or None"""
+        match = ChatHealthService._INTENT_RE.search(content_lower)
+        return match.group(0) if match else None
+    
+    @staticmethod
+    def has_direct_escalation_intent(text: str, text_lower: Optional[str] = None) -> bool:
         """
         STRICT check if user message explicitly requests therapist/appointment.
         This function is called IMMEDIATELY after user message is received.
@@ -50,28 +82,30 @@ class ChatHealthService:
         
         Args:
             text: The user's message text
+            text_lower: The message already stripped and lowercased, if the caller has it
             
         Returns:
             True if user is asking for therapist/appointment (triggers IMMEDIATE escalation)
         """
-        if not text or len(text.strip()) == 0:
-            logger.info("Empty message - no intent")
+        content_lower = text_lower if text_lower is not None else (text or "").lower().strip()
+        if not content_lower:
+            logger.debug("Empty message - no intent")
             return False
         
-        content_lower = text.lower().strip()
-        logger.info(f"Checking intent for: '{content_lower}'")
-        
-        # Check each keyword
-        for keyword in ChatHealthService.INTENT_KEYWORDS:
-            if keyword in content_lower:
-                logger.warning(f"=" * 80)
-                logger.warning(f"🚨🚨🚨 KEYWORD MATCH FOUND 🚨🚨🚨")
-                logger.warning(f"Keyword: '{keyword}'")
-                logger.warning(f"User message: '{text}'")
-                logger.warning(f"=" * 80)
-                return True
+        logger.debug("Checking intent for: '%s'", content_lower)
         
-        logger.info(f"No keywords found in message")
+        # Single pass over the message for all keywords
+        if len(content_lower) <= ChatHealthService._INTENT_CACHE_MAX_LENGTH:
+            keyword = ChatHealthService._cached_intent_match(content_lower)
+        else:
+            match = ChatHealthService._INTENT_RE.search(content_lower)
+            keyword = match.group(0) if match else None
+        if keyword:
+            logger.warning("🚨 KEYWORD MATCH FOUND: '%s'", keyword)
+            logger.debug("User message: '%s'", text)
+            return True
+        
+        logger.debug("No keywords found in message")
         return False
     
     @staticmethod
@@ -88,7 +122,7 @@ class ChatHealthService:
         return ChatHealthService.has_direct_escalation_intent(message_content)
     
     @staticmethod
-    def detect_ai_repetition(messages: List[ChatMessage]) -> bool:
+    def detect_ai_repetition(messages: List[MessageLike]) -> bool:
         """
         Detect if AI is repeating the same response (looping).
         
@@ -110,18 +144,19 @@ class ChatHealthService:
         # Check if any response appears 3+ times
         response_counts = {}
         for msg in ai_messages:
-            # Normalize content (strip, lowercase, first 100 chars for comparison)
-            normalized = msg.content.strip().lower()[:100]
+            # Normalize content (strip, first 100 chars, lowercase); slicing before
+            # lower() keeps the copy at 100 chars however long the reply is
+            normalized = msg.content.strip()[:100].lower()
             response_counts[normalized] = response_counts.get(normalized, 0) + 1
             
             if response_counts[normalized] >= 3:
-                logger.warning(f"AI repetition detected: same response appeared {response_counts[normalized]} times")
+                logger.warning("AI repetition detected: same response appeared %d times", response_counts[normalized])
                 return True
         
         return False
     
     @staticmethod
-    def evaluate_chat_health(messages: List[ChatMessage]) -> Dict:
+    def evaluate_chat_health(messages: List[MessageLike]) -> Dict:
         """
         Evaluate if a chat session is struggling and needs therapist intervention.
         Uses OR logic: triggers if ANY condition is met.
@@ -156,31 +191,40 @@ class ChatHealthService:
         low_confidence_ai_count = 0
         
         for message in recent_messages:
+            sender_type = message.sender_type
+            
             # Check visitor messages for negative emotions
-            if message.sender_type == SenderType.VISITOR and message.emotion:
-                if message.emotion.lower() in ChatHealthService.NEGATIVE_EMOTIONS:
+            # Emotion labels are stored lowercase (see emotion_service)
+            if sender_type == SenderType.VISITOR:
+                if message.emotion in ChatHealthService.NEGATIVE_EMOTIONS:
                     negative_emotion_count += 1
-                    logger.info(f"Detected negative emotion: {message.emotion}")
+                    if negative_emotion_count >= 3:
+                        # Distress outranks every other reason; the rest can't change the result
+                        break
             
             # Check AI messages for low confidence
-            if message.sender_type == SenderType.AI and message.confidence:
+            elif sender_type == SenderType.AI and message.confidence:
                 if message.confidence < ChatHealthService.LOW_CONFIDENCE_THRESHOLD:
                     low_confidence_ai_count += 1
-                    logger.info(f"Detected low AI confidence: {message.confidence}")
+        
+        logger.debug(
+            "Chat health counts: %d negative emotions, %d low-confidence AI replies",
+            negative_emotion_count, low_confidence_ai_count
+        )
         
         # Evaluate if struggling based on ANY criteria (OR logic)
         emotional_distress = negative_emotion_count >= 3
         low_ai_effectiveness = low_confidence_ai_count >= 2
         
         if emotional_distress:
-            logger.warning(f"Chat health check: Emotional distress detected ({negative_emotion_count} negative emotions)")
+            logger.warning("Chat health check: Emotional distress detected (%d negative emotions)", negative_emotion_count)
             return {
                 "struggling": True,
                 "reason": "emotional_distress"
             }
         
         if low_ai_effectiveness:
-            logger.warning(f"Chat health check: Low AI effectiveness ({low_confidence_ai_count} low confidence responses)")
+            logger.warning("Chat health check: Low AI effectiveness (%d low confidence responses)", low_confidence_ai_count)
             return {
                 "struggling": True,
                 "reason": "low_ai_confidence"
@@ -194,7 +238,7 @@ class ChatHealthService:
     
     @staticmethod
     def should_trigger_escalation(
-        messages: List[ChatMessage],
+        messages: List[MessageLike],
         escalation_already_triggered: bool
     ) -> bool:
         """
@@ -1,29 +1,59 @@
-from typing import List, Optional
+import asyncio
+import re
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
 from uuid import UUID
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, desc, func, insert, Row
+from datetime import datetime, timedelta, timezone
+from uuid6 import uuid7
 
 from app.models.chat import ChatMessage, SenderType
+from app.models.chat_escalation import ChatEscalation, EscalationDecision
 from app.models.visitor import Visitor
 from app.models.emotion import EmotionData
 from app.schemas.chat import ChatMessageCreate, ChatMessageResponse
+from app.services.chat_health_service import MessageLike
 from app.services.emotion_service import emotion_analyzer
 from app.services.gemini_service import gemini_service
+from app.services.response_cache_service import response_cache_service
+from app.services.semantic_cache_service import semantic_cache_service
 from app.core.logging import logger
 from app.core.ai_lock import is_ai_disabled
 
 
+# Keyword groups for the canned fallback replies, in priority order
+# (substring semantics, like `word in text`)
+_FALLBACK_REPLY_GROUPS = [
+    ("hello", "hello|hi|hey", "Hello! I'm here to listen and support you. How are you feeling today?"),
+    ("sad", "sad|depressed|down", "I'm sorry you're feeling this way. It's okay to feel sad sometimes. Would you like to talk about what's troubling you?"),
+    ("anxious", "anxious|worried|nervous", "I understand anxiety can be overwhelming. Let's take this one step at a time. What's causing you the most worry right now?"),
+]
+
+# All groups in one pattern: anchored lookahead branches are tried in order, so a
+# single search returns the first group (not the leftmost keyword) that matches;
+# the empty named group after each branch tells which one it was
+_FALLBACK_REPLY_RE = re.compile(
+    r"\A(?:" + "|".join(f"(?=.*?(?:{keywords}))(?P<{name}>)" for name, keywords, _ in _FALLBACK_REPLY_GROUPS) + ")",
+    re.DOTALL
+)
+_FALLBACK_REPLIES = {name: reply for name, _, reply in _FALLBACK_REPLY_GROUPS}
+
+
 class ChatService:
     """
     Service layer for chat-related operations.
     Handles message persistence, emotion analysis, and chat history.
     """
     
+    # Earlier messages sent to the model with each new one
+    AI_CONTEXT_MESSAGES = 6
+    
     @staticmethod
-    def create_message(
-        db: Session,
-        message_data: ChatMessageCreate
+    async def create_message(
+        db: AsyncSession,
+        message_data: ChatMessageCreate,
+        commit: bool = True,
+        message_id: Optional[UUID] = None
     ) -> ChatMessage:
         """
         Create a new chat message with emotion analysis.
@@ -31,52 +61,176 @@ class ChatService:
         Args:
             db: Database session
             message_data: Message creation data
+            commit: Commit immediately; if False the message is only added
+                and the caller commits it together with the rest of its writes
+            message_id: Preassigned id (e.g. the id its streamed chunks were sent under)
             
         Returns:
-            Created ChatMessage instance
+            Created ChatMessage instance (id and created_at populated)
+        """
+        rows = await ChatService.build_message(message_data, message_id)
+        db.add_all(rows)
+        
+        if commit:
+            await db.commit()
+        
+        return rows[0]
+    
+    @staticmethod
+    async def create_messages_bulk(
+        db: AsyncSession,
+        messages: List[ChatMessageCreate]
+    ) -> List[dict]:
+        """
+        Create several chat messages (with emotion analysis) in one transaction.
+        Visitor messages are analyzed concurrently (one batched forward pass
+        when the ONNX model is loaded), and rows go in as multi-row INSERTs
+        without ORM unit-of-work bookkeeping.
+        
+        Args:
+            db: Database session
+            messages: Messages to store, in conversation order
+            
+        Returns:
+            Column values of the stored messages, in order
+        """
+        visitor_indices = [i for i, message in enumerate(messages) if message.sender_type == SenderType.VISITOR]
+        analyses = await asyncio.gather(
+            *(emotion_analyzer.analyze_async(messages[i].content) for i in visitor_indices),
+            return_exceptions=True
+        )
+        emotions = dict(zip(visitor_indices, analyses))
+        
+        now = datetime.now(timezone.utc)
+        message_rows = []
+        emotion_rows = []
+        for i, message in enumerate(messages):
+            emotion = None
+            confidence = None
+            analysis = emotions.get(i)
+            if isinstance(analysis, Exception):
+                logger.error("Emotion analysis failed: %s", analysis)
+            elif analysis is not None:
+                emotion, confidence = analysis
+            
+            row = {
+                "id": uuid7(),
+                "session_id": message.session_id,
+                "visitor_id": message.visitor_id,
+                "sender_type": message.sender_type,
+                "content": message.content,
+                "emotion": emotion,
+                "confidence": confidence,
+                "is_read": False,
+                # History is ordered by created_at; keep the batch's order distinct
+                "created_at": now + timedelta(microseconds=i)
+            }
+            message_rows.append(row)
+            
+            if emotion and confidence:
+                emotion_rows.append({
+                    "id": uuid7(),
+                    "session_id": message.session_id,
+                    "message_id": row["id"],
+                    "emotion": emotion,
+                    "confidence": confidence,
+                    "message_content": message.content[:500]
+                })
+        
+        await db.execute(insert(ChatMessage), message_rows)
+        if emotion_rows:
+            await db.execute(insert(EmotionData), emotion_rows)
+        await db.commit()
+        
+        return message_rows
+    
+    @staticmethod
+    async def build_message(
+        message_data: ChatMessageCreate,
+        message_id: Optional[UUID] = None
+    ) -> List[Union[ChatMessage, EmotionData]]:
+        """
+        Build a chat message (with emotion analysis) without touching the database.
+        id and created_at are assigned here, so the message can be sent to the
+        client before it is stored and inserted later in one batch with others.
+        
+        Args:
+            message_data: Message creation data
+            message_id: Preassigned id (defaults to a new UUIDv7)
+            
+        Returns:
+            Rows to add: the ChatMessage first, followed by its EmotionData if any
+        """
+        return await ChatService.build_message_fast(
+            message_data.session_id,
+            message_data.sender_type,
+            message_data.content,
+            message_data.visitor_id,
+            message_id
+        )
+    
+    @staticmethod
+    async def build_message_fast(
+        session_id: UUID,
+        sender_type: SenderType,
+        content: str,
+        visitor_id: Optional[UUID] = None,
+        message_id: Optional[UUID] = None
+    ) -> List[Union[ChatMessage, EmotionData]]:
+        """
+        Same as build_message, from already-validated values (no Pydantic model).
+        For internal callers such as the user-chat WebSocket.
+        
+        Args:
+            session_id: Chat session UUID
+            sender_type: Message sender
+            content: Message text (non-empty, at most MESSAGE_MAX_LENGTH)
+            visitor_id: Visitor UUID (optional)
+            message_id: Preassigned id (defaults to a new UUIDv7)
+            
+        Returns:
+            Rows to add: the ChatMessage first, followed by its EmotionData if any
         """
         # Analyze emotion if message is from visitor
         emotion = None
         confidence = None
         
-        if message_data.sender_type == SenderType.VISITOR:
+        if sender_type == SenderType.VISITOR:
             try:
-                emotion, confidence = emotion_analyzer.analyze(message_data.content)
-                logger.info(f"Emotion detected: {emotion} (confidence: {confidence:.2f})")
+                emotion, confidence = await emotion_analyzer.analyze_async(content)
+                logger.debug("Emotion detected: %s (confidence: %.2f)", emotion, confidence)
             except Exception as e:
-                logger.error(f"Emotion analysis failed: {e}")
+                logger.error("Emotion analysis failed: %s", e)
         
         # Create chat message
         chat_message = ChatMessage(
-            session_id=message_data.session_id,
-            visitor_id=message_data.visitor_id,
-            sender_type=message_data.sender_type,
-            content=message_data.content,
+            id=message_id or uuid7(),
+            session_id=session_id,
+            visitor_id=visitor_id,
+            sender_type=sender_type,
+            content=content,
             emotion=emotion,
-            confidence=confidence
+            confidence=confidence,
+            is_read=False,
+            created_at=datetime.now(timezone.utc)
         )
-        
-        db.add(chat_message)
-        db.commit()
-        db.refresh(chat_message)
+        rows: List[Union[ChatMessage, EmotionData]] = [chat_message]
         
         # Store emotion data separately for analytics
         if emotion and confidence:
-            emotion_data = EmotionData(
-                session_id=message_data.session_id,
+            rows.append(EmotionData(
+                session_id=session_id,
                 message_id=chat_message.id,
                 emotion=emotion,
                 confidence=confidence,
-                message_content=message_data.content[:500]  # Store truncated content
-            )
-            db.add(emotion_data)
-            db.commit()
+                message_content=content[:500]  # Store truncated content
+            ))
         
-        return chat_message
+        return rows
     
     @staticmethod
-    def get_chat_history(
-        db: Session,
+    async def get_chat_history(
+        db: AsyncSession,
         session_id: UUID,
         limit: int = 100
     ) -> List[ChatMessage]:
@@ -91,19 +245,63 @@ class ChatService:
         Returns:
             List of ChatMessage instances
         """
-        messages = db.query(ChatMessage)\
-            .filter(ChatMessage.session_id == session_id)\
-            .order_by(ChatMessage.created_at)\
-            .limit(limit)\
-            .all()
+        result = await db.scalars(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at)
+            .limit(limit)
+        )
         
-        return messages
+        return list(result.all())
     
     @staticmethod
-    def get_ai_response(message_content: str, session_id: Optional[UUID] = None, db: Optional[Session] = None) -> str:
+    async def fetch_turn_context(
+        db: AsyncSession,
+        session_id: UUID,
+        limit: int = 10
+    ) -> Tuple[Optional[EscalationDecision], List[Row]]:
         """
-        Generate AI chatbot response using Google Gemini AI.
-        Falls back to simple responses if Gemini is not available.
+        Load the escalation status and recent history for a session in one query.
+        Only the columns the chat health check reads are selected, so no ORM
+        objects are built. chat_escalations.session_id is unique, so the outer
+        join never multiplies message rows.
+        
+        Args:
+            db: Database session
+            session_id: Chat session UUID
+            limit: Maximum number of recent messages to retrieve
+            
+        Returns:
+            Tuple of (escalation status or None, last `limit` message rows
+            with content, sender_type, emotion and confidence, oldest first)
+        """
+        result = await db.execute(
+            select(
+                ChatMessage.content,
+                ChatMessage.sender_type,
+                ChatMessage.emotion,
+                ChatMessage.confidence,
+                ChatEscalation.user_accepted
+            )
+            .outerjoin(ChatEscalation, ChatEscalation.session_id == ChatMessage.session_id)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(desc(ChatMessage.created_at))
+            .limit(limit)
+        )
+        rows = result.all()
+        
+        if not rows:
+            escalation_status = await db.scalar(
+                select(ChatEscalation.user_accepted).where(ChatEscalation.session_id == session_id)
+            )
+            return escalation_status, []
+        
+        return rows[0].user_accepted, rows[::-1]
+    
+    @staticmethod
+    async def get_ai_response(message_content: str, session_id: Optional[UUID] = None, db: Optional[AsyncSession] = None) -> str:
+        """
+        Generate a complete AI chatbot response (see stream_ai_response).
         
         Args:
             message_content: User's message
@@ -113,27 +311,123 @@ class ChatService:
         Returns:
             AI-generated response (may contain <<ESCALATE>> token)
         """
+        return "".join([chunk async for chunk in ChatService.stream_ai_response(message_content, session_id, db)])
+    
+    @staticmethod
+    async def stream_ai_response(
+        message_content: str,
+        session_id: Optional[UUID] = None,
+        db: Optional[AsyncSession] = None,
+        recent_messages: Optional[Sequence[MessageLike]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream an AI chatbot response using Google Gemini AI.
+        Falls back to simple responses if Gemini is not available.
+        Closing the iterator early (e.g. on <<ESCALATE>>) cancels the Gemini stream.
+        
+        Args:
+            message_content: User's message
+            session_id: Chat session ID for conversation history (optional)
+            db: Database session for retrieving history (optional)
+            recent_messages: Messages before this one, oldest first, if the caller
+                already has them in memory (then the database is not read)
+            
+        Yields:
+            Response text chunks (the full reply may contain <<ESCALATE>> token)
+        """
         # 🚨 GLOBAL AI KILL SWITCH - Check if AI is disabled for this session
-        if session_id and is_ai_disabled(str(session_id)):
-            logger.warning(f"☠️ AI DISABLED FOR SESSION {session_id} - RETURNING EMPTY RESPONSE")
-            return ""  # AI IS DEAD - Return empty string
+        if session_id and await is_ai_disabled(str(session_id)):
+            logger.warning("☠️ AI DISABLED FOR SESSION %s - RETURNING EMPTY RESPONSE", session_id)
+            return  # AI IS DEAD - Yield nothing
+        
+        conversation_history = await ChatService._build_conversation_history(
+            message_content, session_id, db, recent_messages
+        )
+        
+        chunks: List[str] = []
+        embedding = None
+        try:
+            # Identical context -> identical prompt; skip the model call on a hit.
+            # Only complete Gemini replies are cached, never the canned fallbacks.
+            cache_key = response_cache_service.make_key(conversation_history) if gemini_service.enabled else None
+            if cache_key:
+                cached_response = await response_cache_service.get(cache_key)
+                if cached_response is not None:
+                    logger.info("AI Response served from cache: %.50s...", cached_response)
+                    yield cached_response
+                    return
+                
+                # Same earlier turns and a near-identical message
+                if semantic_cache_service.enabled():
+                    embedding = await gemini_service.embed(message_content)
+                    cached_response = await semantic_cache_service.get(conversation_history, embedding) if embedding else None
+                    if cached_response is not None:
+                        logger.info("AI Response served from semantic cache: %.50s...", cached_response)
+                        yield cached_response
+                        return
+            
+            async for chunk in gemini_service.stream_model_response(conversation_history):
+                chunks.append(chunk)
+                yield chunk
+            
+            if chunks:
+                ai_response = "".join(chunks)
+                logger.debug("AI Response generated: %.50s...", ai_response)
+                # Escalation decisions are never replayed from cache; the model
+                # judges every such conversation afresh
+                if gemini_service.is_escalation_response(ai_response):
+                    return
+                if cache_key:
+                    await response_cache_service.set(cache_key, ai_response)
+                if embedding:
+                    semantic_cache_service.set(conversation_history, embedding, ai_response)
+                return
+            
+            yield gemini_service.fallback_response(conversation_history)
+            
+        except Exception as e:
+            logger.error("Error generating AI response: %s", e)
+            # Fallback to simple response, unless part of the reply already went out
+            if not chunks:
+                yield ChatService._fallback_reply(message_content)
+    
+    @staticmethod
+    async def _build_conversation_history(
+        message_content: str,
+        session_id: Optional[UUID],
+        db: Optional[AsyncSession],
+        recent_messages: Optional[Sequence[MessageLike]] = None
+    ) -> List[dict]:
+        """
+        Build the model context: recent session messages plus the new one.
         
-        # Build conversation history for context
+        Args:
+            message_content: User's message
+            session_id: Chat session ID for conversation history (optional)
+            db: Database session for retrieving history (optional)
+            recent_messages: Earlier messages already in memory, oldest first (optional)
+            
+        Returns:
+            List of {role: 'user'|'ai', content: str}
+        """
         conversation_history = []
         
-        if session_id and db:
+        if recent_messages is None and session_id and db:
             try:
-                # Get recent messages for context
-                recent_messages = ChatService.get_chat_history(db, session_id, limit=6)
-                
-                for msg in recent_messages:
-                    role = "user" if msg.sender_type == SenderType.VISITOR else "ai"
-                    conversation_history.append({
-                        "role": role,
-                        "content": msg.content
-                    })
+                # Get the latest messages for context
+                _, recent_messages = await ChatService.fetch_turn_context(
+                    db, session_id, limit=ChatService.AI_CONTEXT_MESSAGES
+                )
             except Exception as e:
-                logger.warning(f"Could not load conversation history: {e}")
+                logger.warning("Could not load conversation history: %s", e)
+        
+        if recent_messages:
+            for msg in recent_messages[-ChatService.AI_CONTEXT_MESSAGES:]:
+                role = "user" if msg.sender_type == SenderType.VISITOR else "ai"
+                conversation_history.append({
+                    "role": role,
+                    "content": msg.content
+                })
         
         # Add current user message
         conversation_history.append({
@@ -141,28 +435,26 @@ class ChatService:
             "content": message_content
         })
         
-        # Use Gemini AI to generate response
-        try:
-            ai_response = gemini_service.generate_response(conversation_history)
-            logger.info(f"AI Response generated: {ai_response[:50]}...")
-            return ai_response
+        return conversation_history
+    
+    @staticmethod
+    def _fallback_reply(message_content: str) -> str:
+        """
+        Keyword-based reply used when response generation fails.
+        
+        Args:
+            message_content: User's message
             
-        except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
-            # Fallback to simple response
-            content_lower = message_content.lower()
-            
-            if any(word in content_lower for word in ["hello", "hi", "hey"]):
-                return "Hello! I'm here to listen and support you. How are you feeling today?"
-            elif any(word in content_lower for word in ["sad", "depressed", "down"]):
-                return "I'm sorry you're feeling this way. It's okay to feel sad sometimes. Would you like to talk about what's troubling you?"
-            elif any(word in content_lower for word in ["anxious", "worried", "nervous"]):
-                return "I understand anxiety can be overwhelming. Let's take this one step at a time. What's causing you the most worry right now?"
-            else:
-                return "I hear you. Can you tell me more about how you're feeling?"
+        Returns:
+            Canned supportive response
+        """
+        match = _FALLBACK_REPLY_RE.match(message_content.lower())
+        if match:
+            return _FALLBACK_REPLIES[match.lastgroup]
+        return "I hear you. Can you tell me more about how you're feeling?"
     
     @staticmethod
-    def get_session_stats(db: Session, session_id: UUID) -> dict:
+    async def get_session_stats(db: AsyncSession, session_id: UUID) -> dict:
         """
         Get statistics for a chat session.
         
@@ -173,11 +465,16 @@ class ChatService:
         Returns:
             Dictionary with session statistics
         """
-        messages = db.query(ChatMessage)\
-            .filter(ChatMessage.session_id == session_id)\
-            .all()
+        # Aggregated in the database; no message rows are loaded
+        message_count, start_time, latest_time = (await db.execute(
+            select(
+                func.count(ChatMessage.id),
+                func.min(ChatMessage.created_at),
+                func.max(ChatMessage.created_at)
+            ).where(ChatMessage.session_id == session_id)
+        )).one()
         
-        if not messages:
+        if not message_count:
             return {
                 "message_count": 0,
                 "start_time": None,
@@ -185,12 +482,10 @@ class ChatService:
                 "duration_minutes": 0
             }
         
-        start_time = messages[0].created_at
-        latest_time = messages[-1].created_at
         duration = (latest_time - start_time).total_seconds() / 60
         
         return {
-            "message_count": len(messages),
+            "message_count": message_count,
             "start_time": start_time,
             "latest_time": latest_time,
             "duration_minutes": round(duration, 2)
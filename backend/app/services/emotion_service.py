@@ -1,23 +1,123 @@
-from typing import Optional, Tuple
+import asyncio
+import os
+from typing import List, Optional, Tuple
 from datetime import datetime
 import re
+from collections import Counter
+from functools import lru_cache
 from app.core.config import settings
+from app.models.emotion import EMOTION_CODES
 from app.core.logging import logger
 
 
+# Emotion keyword dictionaries
+EMOTION_KEYWORDS = {
+    "joy": ["happy", "excited", "great", "wonderful", "amazing", "fantastic", "love", "enjoy", "glad", "pleased"],
+    "sadness": ["sad", "depressed", "unhappy", "miserable", "down", "lonely", "cry", "grief", "sorrow", "blue"],
+    "anger": ["angry", "mad", "furious", "annoyed", "frustrated", "irritated", "rage", "hate", "upset"],
+    "fear": ["afraid", "scared", "anxious", "worried", "nervous", "panic", "terrified", "frightened", "fear"],
+    "surprise": ["surprised", "shocked", "amazed", "astonished", "unexpected", "wow", "incredible"],
+    "disgust": ["disgusted", "gross", "awful", "terrible", "horrible", "nasty", "yuck"],
+    "neutral": ["okay", "fine", "alright", "normal", "regular"]
+}
+
+# Keyword -> emotion, and all keywords compiled into one alternation wrapped in
+# a lookahead so overlapping occurrences are all found. No keyword is a prefix
+# of another, so the distinct matches are exactly the keywords contained in the
+# text (same substring semantics as `keyword in text`)
+_KEYWORD_EMOTIONS = {
+    keyword: emotion
+    for emotion, keywords in EMOTION_KEYWORDS.items()
+    for keyword in keywords
+}
+_EMOTION_KEYWORDS_RE = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in _KEYWORD_EMOTIONS) + "))"
+)
+
+
+def _build_automaton():
+    """Aho-Corasick automaton over all keywords, or None if pyahocorasick is missing"""
+    try:
+        import ahocorasick
+    except ImportError:
+        logger.info("pyahocorasick not installed - using regex keyword matching")
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for keyword in _KEYWORD_EMOTIONS:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+# Finds every keyword occurrence in one pass whatever the number of keywords;
+# the regex above is used when the optional package is not installed
+_EMOTION_AUTOMATON = _build_automaton()
+
+
+# Messages up to this length have their result memoized (users repeat short
+# phrasings such as "hi" or "i'm sad"); longer ones are always scanned
+_KEYWORD_CACHE_MAX_LENGTH = 256
+
+
+def _keyword_emotion(text_lower: str) -> Tuple[str, float]:
+    """Dominant keyword emotion and confidence for lowercased text"""
+    # Count matched keywords per emotion (one scan for all emotions)
+    if _EMOTION_AUTOMATON is not None:
+        matched = {keyword for _, keyword in _EMOTION_AUTOMATON.iter(text_lower)}
+    else:
+        matched = set(_EMOTION_KEYWORDS_RE.findall(text_lower))
+    emotion_scores = Counter(_KEYWORD_EMOTIONS[keyword] for keyword in matched)
+    
+    # Return dominant emotion or neutral (ties go to the emotion listed first)
+    if emotion_scores:
+        dominant_emotion = max(EMOTION_KEYWORDS, key=emotion_scores.__getitem__)
+        # Calculate confidence based on keyword matches (normalize to 0.5-0.9 range)
+        max_count = emotion_scores[dominant_emotion]
+        confidence = min(0.5 + (max_count * 0.1), 0.9)
+        return dominant_emotion, confidence
+    
+    return "neutral", 0.6
+
+
+_cached_keyword_emotion = lru_cache(maxsize=4096)(_keyword_emotion)
+
+
 class EmotionAnalyzer:
     """
     Emotion analysis service using HuggingFace transformers with rule-based fallback.
     Analyzes text content and returns emotion classification with confidence score.
     """
     
+    # File name written by optimum's ORTQuantizer in the exported model directory
+    ONNX_MODEL_FILE = "model_quantized.onnx"
+    
+    # Token limit for the ONNX classifier (chat messages are short)
+    ONNX_MAX_TOKENS = 128
+    
+    # Most texts classified in one ONNX forward pass
+    ONNX_MAX_BATCH = 32
+    
     def __init__(self):
         self.model = None
-        self.use_transformer = True
+        self.session = None
+        self.tokenizer = None
+        self.labels: List[str] = []
+        self._batch_queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+        self._batch_task: Optional["asyncio.Task[None]"] = None
+        # Rule-based until load_model has run (at startup, in a thread)
+        self.use_transformer = False
+    
+    def load_model(self):
+        """Load the configured emotion model; kept off the import path because it can take seconds"""
         self._initialize_model()
     
     def _initialize_model(self):
         """Initialize the HuggingFace emotion classification model"""
+        # int8 ONNX export of the classifier, if one is configured
+        if settings.EMOTION_ONNX_MODEL_DIR and self._load_onnx_model(settings.EMOTION_ONNX_MODEL_DIR):
+            return
+        
         # For quick startup, use rule-based detection only
         # To enable HuggingFace transformer: install transformers and torch, then uncomment below
         logger.info("Using rule-based emotion detection for fast startup")
@@ -38,6 +138,78 @@ class EmotionAnalyzer:
         #     logger.warning(f"Failed to load transformer model: {e}. Using fallback emotion detection.")
         #     self.use_transformer = False
     
+    def _load_onnx_model(self, model_dir: str) -> bool:
+        """
+        Load an int8-quantized ONNX export of the emotion classifier.
+        Requires onnxruntime and transformers (tokenizer only, no torch). Export with:
+            ORTModelForSequenceClassification.from_pretrained(EMOTION_MODEL, export=True)
+            ORTQuantizer + AutoQuantizationConfig (dynamic, QInt8 weights)
+        
+        Args:
+            model_dir: Directory with the quantized model, its config and tokenizer
+            
+        Returns:
+            True if the model was loaded
+        """
+        try:
+            import onnxruntime as ort
+            from transformers import AutoConfig, AutoTokenizer
+            
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(
+                os.path.join(model_dir, self.ONNX_MODEL_FILE),
+                options,
+                providers=["CPUExecutionProvider"]
+            )
+            self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+            id2label = AutoConfig.from_pretrained(model_dir).id2label
+            self.labels = [id2label[i].lower() for i in range(len(id2label))]
+            unknown_labels = set(self.labels) - EMOTION_CODES.keys()
+            if unknown_labels:
+                # Emotions are stored as EmotionCode; other labels can't be saved
+                raise ValueError(f"unsupported emotion labels {sorted(unknown_labels)}")
+            self._onnx_inputs = [model_input.name for model_input in self.session.get_inputs()]
+            
+            logger.info("Loaded ONNX emotion model from %s", model_dir)
+            self.use_transformer = True
+            return True
+        except Exception as e:
+            logger.warning("Failed to load ONNX emotion model: %s. Using fallback emotion detection.", e)
+            self.session = None
+            self.tokenizer = None
+            return False
+    
+    def _classify_onnx(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Run the ONNX classifier on a batch of texts.
+        
+        Args:
+            texts: Non-empty input texts
+            
+        Returns:
+            (emotion, confidence) for each text, in order
+        """
+        import numpy as np
+        
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.ONNX_MAX_TOKENS,
+            return_tensors="np"
+        )
+        logits = self.session.run(None, {name: encoded[name].astype(np.int64) for name in self._onnx_inputs})[0]
+        
+        # Softmax over the labels
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[label], float(probabilities[row, label])) for row, label in enumerate(best)]
+    
     def analyze(self, text: str) -> Tuple[str, float]:
         """
         Analyze emotion in text.
@@ -52,6 +224,12 @@ class EmotionAnalyzer:
             return "neutral", 0.5
         
         # Try transformer model first
+        if self.use_transformer and self.session is not None:
+            try:
+                return self._classify_onnx([text])[0]
+            except Exception as e:
+                logger.warning("ONNX analysis failed: %s. Using fallback.", e)
+        
         if self.use_transformer and self.model:
             try:
                 result = self.model(text[:512])[0][0]  # Limit text length
@@ -59,45 +237,72 @@ class EmotionAnalyzer:
                 confidence = result['score']
                 return emotion, confidence
             except Exception as e:
-                logger.warning(f"Transformer analysis failed: {e}. Using fallback.")
+                logger.warning("Transformer analysis failed: %s. Using fallback.", e)
         
         # Fallback to rule-based emotion detection
         return self._fallback_emotion_detection(text)
     
+    async def analyze_async(self, text: str) -> Tuple[str, float]:
+        """
+        Analyze emotion without blocking the event loop.
+        Transformer inference runs in a worker thread (ONNX requests are
+        batched, see _run_onnx_batches); the rule-based fallback is cheap
+        enough to run inline.
+        
+        Args:
+            text: Input text to analyze
+            
+        Returns:
+            Tuple of (emotion: str, confidence: float)
+        """
+        if self.use_transformer and self.session is not None and text and text.strip():
+            return await self._analyze_batched(text)
+        if self.use_transformer and self.model:
+            return await asyncio.to_thread(self.analyze, text)
+        return self.analyze(text)
+    
+    async def _analyze_batched(self, text: str) -> Tuple[str, float]:
+        """Queue a text for the ONNX batch runner and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self._batch_task is None or self._batch_task.done() or self._batch_task.get_loop() is not loop:
+            self._batch_queue = asyncio.Queue()
+            self._batch_task = asyncio.create_task(self._run_onnx_batches(self._batch_queue))
+        
+        future = loop.create_future()
+        self._batch_queue.put_nowait((text, future))
+        return await future
+    
+    async def _run_onnx_batches(self, queue: "asyncio.Queue[Tuple[str, asyncio.Future]]"):
+        """
+        Classify queued texts, one forward pass per batch.
+        Everything queued while the previous batch ran (up to ONNX_MAX_BATCH)
+        goes into the next one, so a lone message is not held back by a timer.
+        """
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.ONNX_MAX_BATCH and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            texts = [text for text, _ in batch]
+            try:
+                results = await asyncio.to_thread(self._classify_onnx, texts)
+            except Exception as e:
+                logger.warning("ONNX analysis failed: %s. Using fallback.", e)
+                results = [self._fallback_emotion_detection(text) for text in texts]
+            
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    
     def _fallback_emotion_detection(self, text: str) -> Tuple[str, float]:
         """
         Rule-based emotion detection using keyword matching.
         Returns emotion and confidence score.
         """
         text_lower = text.lower()
-        
-        # Emotion keyword dictionaries
-        emotion_keywords = {
-            "joy": ["happy", "excited", "great", "wonderful", "amazing", "fantastic", "love", "enjoy", "glad", "pleased"],
-            "sadness": ["sad", "depressed", "unhappy", "miserable", "down", "lonely", "cry", "grief", "sorrow", "blue"],
-            "anger": ["angry", "mad", "furious", "annoyed", "frustrated", "irritated", "rage", "hate", "upset"],
-            "fear": ["afraid", "scared", "anxious", "worried", "nervous", "panic", "terrified", "frightened", "fear"],
-            "surprise": ["surprised", "shocked", "amazed", "astonished", "unexpected", "wow", "incredible"],
-            "disgust": ["disgusted", "gross", "awful", "terrible", "horrible", "nasty", "yuck"],
-            "neutral": ["okay", "fine", "alright", "normal", "regular"]
-        }
-        
-        # Count matches for each emotion
-        emotion_scores = {}
-        for emotion, keywords in emotion_keywords.items():
-            count = sum(1 for keyword in keywords if keyword in text_lower)
-            if count > 0:
-                emotion_scores[emotion] = count
-        
-        # Return dominant emotion or neutral
-        if emotion_scores:
-            dominant_emotion = max(emotion_scores, key=emotion_scores.get)
-            # Calculate confidence based on keyword matches (normalize to 0.5-0.9 range)
-            max_count = emotion_scores[dominant_emotion]
-            confidence = min(0.5 + (max_count * 0.1), 0.9)
-            return dominant_emotion, confidence
-        
-        return "neutral", 0.6
+        if len(text_lower) <= _KEYWORD_CACHE_MAX_LENGTH:
+            return _cached_keyword_emotion(text_lower)
+        return _keyword_emotion(text_lower)
 
 
 # Global emotion analyzer instance
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal
+from app.models.chat_escalation import ChatEscalation
+from app.core.logging import logger
+
+
+class EscalationLoaderService:
+    """
+    Batched per-session escalation lookups (DataLoader-style).
+    Lookups made in the same event-loop iteration, e.g. a dashboard fetching
+    many sessions at once, are answered by a single
+    `WHERE session_id IN (...)` query instead of one query each.
+    Nothing waits for a timer, so a lone lookup is not delayed.
+    """
+
+    # session_id -> futures of the callers waiting for it
+    _pending: Dict[UUID, List["asyncio.Future[Optional[ChatEscalation]]"]] = {}
+    _dispatch_task: Optional["asyncio.Task[None]"] = None
+
+    @staticmethod
+    async def load(session_id: UUID) -> Optional[ChatEscalation]:
+        """
+        Get the escalation for a session.
+
+        Args:
+            session_id: Chat session UUID
+
+        Returns:
+            ChatEscalation (detached from its session), or None if none exists
+        """
+        future = asyncio.get_running_loop().create_future()
+        EscalationLoaderService._pending.setdefault(session_id, []).append(future)
+
+        # The task first runs on the next loop iteration, after every lookup
+        # already queued in this one has been added
+        if EscalationLoaderService._dispatch_task is None:
+            EscalationLoaderService._dispatch_task = asyncio.create_task(EscalationLoaderService._dispatch())
+
+        return await future
+
+    @staticmethod
+    async def _dispatch():
+        """Run one query for every pending session and resolve the waiting callers"""
+        batch = EscalationLoaderService._pending
+        EscalationLoaderService._pending = {}
+        EscalationLoaderService._dispatch_task = None
+
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.scalars(
+                    select(ChatEscalation).where(ChatEscalation.session_id.in_(list(batch)))
+                )
+                escalations = {escalation.session_id: escalation for escalation in result.all()}
+        except Exception as e:
+            logger.error("Error loading escalations: %s", e)
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        if len(batch) > 1:
+            logger.debug("Loaded escalations for %d sessions in one query", len(batch))
+
+        for session_id, futures in batch.items():
+            escalation = escalations.get(session_id)
+            for future in futures:
+                if not future.done():
+                    future.set_result(escalation)
+
+
+escalation_loader_service = EscalationLoaderService()
@@ -7,7 +7,10 @@ This service uses Gemini AI with a specialized system prompt to:
 3. Output <<ESCALATE>> token when escalation is needed
 """
 
-from typing import List, Optional
+import random
+import re
+import threading
+from typing import AsyncIterator, List, Optional
 from app.core.config import settings
 from app.core.logging import logger
 
@@ -44,91 +47,160 @@ User: "Nothing is working for me"
 You: I'm sorry you're going through a difficult time. It might help to speak with a professional therapist who can provide more support. Would that be helpful?
 """
     
+    # Keywords that make the fallback reply escalate, as one compiled alternation
+    _FALLBACK_ESCALATION_RE = re.compile("therapist|counselor|doctor|appointment|human|real person")
+    
+    # Generic supportive replies for the fallback
+    _FALLBACK_RESPONSES = (
+        "I hear you. Can you tell me more about what you're experiencing?",
+        "That sounds challenging. I'm here to listen.",
+        "Thank you for sharing that with me. How does that make you feel?",
+        "I understand. Would you like to talk more about this?",
+    )
+    
+    # Embedding model for the semantic response cache
+    EMBEDDING_MODEL = "models/text-embedding-004"
+    
     def __init__(self):
-        """Initialize Gemini service"""
+        """Initialize Gemini service (the SDK itself is loaded by preload, see _ensure_model)"""
         self.model = None
-        self.enabled = False
-        self._initialize()
+        self.enabled = self._is_configured()
+        self._initialized = False
+        self._init_lock = threading.Lock()
     
-    def _initialize(self):
-        """Initialize Google Gemini AI model"""
+    @staticmethod
+    def _is_configured() -> bool:
+        """Whether Gemini is switched on and has an API key"""
         if not settings.USE_GEMINI:
             logger.info("Gemini AI is disabled in settings")
-            return
+            return False
         
         if not settings.GEMINI_API_KEY or settings.GEMINI_API_KEY == "":
             logger.warning("GEMINI_API_KEY not set - using fallback responses")
+            return False
+        
+        return True
+    
+    def preload(self):
+        """Load the SDK ahead of the first request (run in a thread at startup)"""
+        if self.enabled:
+            self._ensure_model()
+    
+    def _ready(self) -> bool:
+        """
+        Whether the model is loaded and usable.
+        Only reads state, never loads: while preload is still importing the SDK
+        callers get False and use the fallback paths instead of waiting.
+        """
+        return self.enabled and self._initialized and self.model is not None
+    
+    def _ensure_model(self):
+        """
+        Initialize Google Gemini AI model once.
+        Importing the SDK takes a while, so it is kept off the import path and
+        the event loop (preload runs it in a thread); a failure disables Gemini
+        (fallback responses).
+        """
+        if self._initialized:
             return
         
-        try:
-            import google.generativeai as genai
-            
-            # Configure Gemini with API key
-            genai.configure(api_key=settings.GEMINI_API_KEY)
+        with self._init_lock:
+            if self._initialized:
+                return
             
-            # Create model with system instruction
-            self.model = genai.GenerativeModel(
-                "gemini-pro",
-                system_instruction=self.SYSTEM_PROMPT
-            )
-            
-            self.enabled = True
-            logger.info("✅ Gemini AI initialized successfully")
+            try:
+                import google.generativeai as genai
+                
+                # Configure Gemini with API key
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                
+                # Create model with system instruction
+                self.model = genai.GenerativeModel(
+                    "gemini-pro",
+                    system_instruction=self.SYSTEM_PROMPT
+                )
+                
+                logger.info("✅ Gemini AI initialized successfully")
+                
+            except ImportError:
+                logger.error("google-generativeai package not installed")
+                self.enabled = False
+            except Exception as e:
+                logger.error("Failed to initialize Gemini AI: %s", e)
+                self.enabled = False
             
-        except ImportError:
-            logger.error("google-generativeai package not installed")
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini AI: {e}")
+            self._initialized = True
     
-    def generate_response(self, conversation_history: List[dict]) -> str:
+    async def stream_model_response(self, conversation_history: List[dict]) -> AsyncIterator[str]:
         """
-        Generate AI response using Gemini.
+        Stream an AI response from Gemini chunk by chunk (no fallback).
+        Yields nothing if Gemini is disabled; API errors propagate to the caller.
+        Closing the generator early releases the streaming call, which gRPC
+        cancels, so the rest of the reply is never generated or billed.
         
         Args:
             conversation_history: List of {role: 'user'|'ai', content: str}
             
-        Returns:
-            AI response text (may contain <<ESCALATE>> token)
+        Yields:
+            Response text chunks as Gemini produces them
         """
-        if not self.enabled or not self.model:
+        if not self._ready():
             logger.info("Gemini not enabled, using fallback")
-            return self._fallback_response(conversation_history)
+            return
         
-        try:
-            # Format conversation for Gemini
-            # Take last 6 messages (3 exchanges) for context
-            recent_messages = conversation_history[-6:] if len(conversation_history) > 6 else conversation_history
-            
-            # Build prompt from conversation
-            prompt_parts = []
-            for msg in recent_messages:
-                role = "User" if msg.get("role") == "user" else "Assistant"
-                content = msg.get("content", "")
-                prompt_parts.append(f"{role}: {content}")
-            
-            # Add current prompt
-            prompt = "\n".join(prompt_parts)
-            
-            logger.info(f"Sending to Gemini:\n{prompt}")
-            
-            # Generate response
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            logger.info(f"Gemini response: {ai_text}")
+        prompt = self._build_prompt(conversation_history)
+        # Sizes only: the prompt is the user's conversation and is never logged
+        logger.debug("Streaming from Gemini (%d-char prompt)", len(prompt))
+        
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    
+    async def embed(self, text: str) -> Optional[List[float]]:
+        """
+        Embed text for similarity comparison.
+        
+        Args:
+            text: Text to embed
             
-            # Check if Gemini wants to escalate
-            if "<<ESCALATE>>" in ai_text:
-                logger.warning("🚨 Gemini detected need for therapist escalation!")
-                logger.warning(f"Gemini's full response was: {ai_text}")
+        Returns:
+            Embedding vector, or None if Gemini is disabled or the call failed
+        """
+        if not self._ready():
+            return None
+        
+        try:
+            import google.generativeai as genai
             
-            return ai_text
+            result = await genai.embed_content_async(
+                model=self.EMBEDDING_MODEL,
+                content=text,
+                task_type="semantic_similarity"
+            )
+            return result["embedding"]
             
         except Exception as e:
-            logger.error(f"Gemini AI error: {e}")
-            return self._fallback_response(conversation_history)
+            logger.error("Gemini embedding error: %s", e)
+            return None
     
-    def _fallback_response(self, conversation_history: List[dict]) -> str:
+    @staticmethod
+    def _build_prompt(conversation_history: List[dict]) -> str:
+        """
+        Format the last 6 messages (3 exchanges) as a Gemini prompt.
+        
+        Args:
+            conversation_history: List of {role: 'user'|'ai', content: str}
+            
+        Returns:
+            Prompt text
+        """
+        return "\n".join(
+            f"{'User' if msg.get('role') == 'user' else 'Assistant'}: {msg.get('content', '')}"
+            for msg in conversation_history[-6:]
+        )
+    
+    def fallback_response(self, conversation_history: List[dict]) -> str:
         """
         Simple fallback responses when Gemini is not available.
         Still includes <<ESCALATE>> token detection for keywords.
@@ -139,20 +211,11 @@ You: I'm sorry you're going through a difficult time. It might help to speak wit
         last_message = conversation_history[-1].get("content", "").lower()
         
         # Check for direct escalation keywords
-        escalation_keywords = ["therapist", "counselor", "doctor", "appointment", "human", "real person"]
-        if any(keyword in last_message for keyword in escalation_keywords):
+        if self._FALLBACK_ESCALATION_RE.search(last_message):
             return "<<ESCALATE>>"
         
         # Generic supportive responses
-        responses = [
-            "I hear you. Can you tell me more about what you're experiencing?",
-            "That sounds challenging. I'm here to listen.",
-            "Thank you for sharing that with me. How does that make you feel?",
-            "I understand. Would you like to talk more about this?",
-        ]
-        
-        import random
-        return random.choice(responses)
+        return random.choice(self._FALLBACK_RESPONSES)
     
     def is_escalation_response(self, response: str) -> bool:
         """
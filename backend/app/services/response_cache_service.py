@@ -0,0 +1,101 @@
+import hashlib
+import time
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.core.logging import logger
+
+
+class ResponseCacheService:
+    """
+    Exact-match cache for AI replies.
+    Keyed on a hash of the conversation context sent to the model, so a
+    reply is only reused when the model would see exactly the same input.
+    Backed by Redis when configured, otherwise by an in-process TTL cache.
+    """
+
+    KEY_PREFIX = "neurosupport:ai_response:"
+
+    # Local fallback: key -> (expires_at, reply)
+    _local_cache: Dict[str, Tuple[float, str]] = {}
+    _LOCAL_CACHE_MAX_SIZE = 10_000
+
+    @staticmethod
+    def make_key(conversation_history: List[dict]) -> str:
+        """
+        Build the cache key for a conversation context.
+
+        Args:
+            conversation_history: List of {role, content} sent to the model
+
+        Returns:
+            Cache key
+        """
+        digest = hashlib.blake2b(orjson.dumps(conversation_history), digest_size=16).hexdigest()
+        return f"{ResponseCacheService.KEY_PREFIX}{digest}"
+
+    @staticmethod
+    async def get(key: str) -> Optional[str]:
+        """
+        Look up a cached reply.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Cached reply, or None on miss or when caching is disabled
+        """
+        if settings.AI_RESPONSE_CACHE_TTL_SECONDS <= 0:
+            return None
+
+        if redis_client is not None:
+            try:
+                return await redis_client.get(key)
+            except Exception as e:
+                logger.error("Redis read failed for AI response cache: %s", e)
+                return None
+
+        entry = ResponseCacheService._local_cache.get(key)
+        if entry is None:
+            return None
+
+        expires_at, reply = entry
+        if expires_at < time.monotonic():
+            ResponseCacheService._local_cache.pop(key, None)
+            return None
+        return reply
+
+    @staticmethod
+    async def set(key: str, reply: str):
+        """
+        Store a reply for AI_RESPONSE_CACHE_TTL_SECONDS.
+
+        Args:
+            key: Key from make_key
+            reply: Model reply to cache
+        """
+        ttl = settings.AI_RESPONSE_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return
+
+        if redis_client is not None:
+            try:
+                await redis_client.set(key, reply, ex=ttl)
+            except Exception as e:
+                logger.error("Redis write failed for AI response cache: %s", e)
+            return
+
+        cache = ResponseCacheService._local_cache
+        now = time.monotonic()
+        if len(cache) >= ResponseCacheService._LOCAL_CACHE_MAX_SIZE:
+            for expired_key in [k for k, (expires_at, _) in cache.items() if expires_at < now]:
+                del cache[expired_key]
+            if len(cache) >= ResponseCacheService._LOCAL_CACHE_MAX_SIZE:
+                cache.clear()
+        cache[key] = (now + ttl, reply)
+
+
+response_cache_service = ResponseCacheService()
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import math
+import operator
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class SemanticCacheService:
+    """
+    Similarity cache for AI replies.
+    A reply is reused when the new user message means nearly the same as one
+    answered before after the same earlier conversation: prior turns must
+    match exactly (hashed, as in ResponseCacheService) and only the latest
+    message is compared, by cosine similarity of its embedding.
+    In-process per worker; the candidates for a context are scanned linearly
+    on a worker thread so the event loop keeps serving sockets.
+    """
+
+    # context key -> [(expires_at, unit embedding, reply)], oldest first
+    _entries: Dict[str, List[Tuple[float, array, str]]] = {}
+    _size = 0
+    _MAX_ENTRIES = 5_000
+
+    # Candidates kept per context (bounds the scan for common openers)
+    _MAX_ENTRIES_PER_CONTEXT = 64
+
+    @staticmethod
+    def enabled() -> bool:
+        """Whether semantic caching is switched on"""
+        return settings.AI_SEMANTIC_CACHE_ENABLED and settings.AI_RESPONSE_CACHE_TTL_SECONDS > 0
+
+    @staticmethod
+    def _context_key(conversation_history: List[dict]) -> str:
+        """Hash of every turn before the latest message"""
+        return hashlib.blake2b(orjson.dumps(conversation_history[:-1]), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[array]:
+        """Scale to unit length so cosine similarity is a plain dot product"""
+        norm = math.sqrt(math.fsum(x * x for x in embedding))
+        if norm == 0:
+            return None
+        return array("f", (x / norm for x in embedding))
+
+    @staticmethod
+    def _best_match(entries: List[Tuple[float, array, str]], embedding: List[float]) -> Optional[Tuple[float, str]]:
+        """Highest-scoring live entry at or above the threshold, as (score, reply)"""
+        vector = SemanticCacheService._normalize(embedding)
+        if vector is None:
+            return None
+
+        now = time.monotonic()
+        best_score = settings.AI_SEMANTIC_CACHE_THRESHOLD
+        best_reply = None
+        for expires_at, cached_vector, reply in entries:
+            if expires_at < now or len(cached_vector) != len(vector):
+                continue
+            score = sum(map(operator.mul, vector, cached_vector))
+            if score >= best_score:
+                best_score, best_reply = score, reply
+
+        return (best_score, best_reply) if best_reply is not None else None
+
+    @staticmethod
+    async def get(conversation_history: List[dict], embedding: List[float]) -> Optional[str]:
+        """
+        Find the cached reply to the most similar earlier message.
+
+        Args:
+            conversation_history: List of {role, content} sent to the model
+            embedding: Embedding of the latest user message
+
+        Returns:
+            Cached reply, or None if nothing reaches AI_SEMANTIC_CACHE_THRESHOLD
+        """
+        entries = SemanticCacheService._entries.get(SemanticCacheService._context_key(conversation_history))
+        if not entries:
+            return None
+
+        # Scan a snapshot: set() may append or evict while the thread runs
+        match = await asyncio.to_thread(SemanticCacheService._best_match, list(entries), embedding)
+        if match is None:
+            return None
+
+        logger.info("Semantic cache hit (similarity %.3f)", match[0])
+        return match[1]
+
+    @staticmethod
+    def set(conversation_history: List[dict], embedding: List[float], reply: str):
+        """
+        Store a reply for AI_RESPONSE_CACHE_TTL_SECONDS.
+
+        Args:
+            conversation_history: List of {role, content} sent to the model
+            embedding: Embedding of the latest user message
+            reply: Model reply to cache
+        """
+        vector = SemanticCacheService._normalize(embedding)
+        if vector is None:
+            return
+
+        cache = SemanticCacheService._entries
+        now = time.monotonic()
+        if SemanticCacheService._size >= SemanticCacheService._MAX_ENTRIES:
+            SemanticCacheService._sweep(now)
+
+        entries = cache.setdefault(SemanticCacheService._context_key(conversation_history), [])
+        if len(entries) >= SemanticCacheService._MAX_ENTRIES_PER_CONTEXT:
+            entries.pop(0)
+            SemanticCacheService._size -= 1
+        entries.append((now + settings.AI_RESPONSE_CACHE_TTL_SECONDS, vector, reply))
+        SemanticCacheService._size += 1
+
+    @staticmethod
+    def _sweep(now: float):
+        """Drop expired entries; clear everything if the cache is still full"""
+        cache = SemanticCacheService._entries
+        size = 0
+        for key in list(cache):
+            live = [entry for entry in cache[key] if entry[0] >= now]
+            if live:
+                cache[key] = live
+                size += len(live)
+            else:
+                del cache[key]
+
+        if size >= SemanticCacheService._MAX_ENTRIES:
+            cache.clear()
+            size = 0
+        SemanticCacheService._size = size
+
+
+semantic_cache_service = SemanticCacheService()
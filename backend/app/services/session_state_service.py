@@ -0,0 +1,135 @@
+import time
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.models.appointment import Appointment, ChatMode
+from app.models.chat_escalation import EscalationDecision
+from app.core.redis_client import redis_client
+from app.core.logging import logger
+
+
+class SessionStateService:
+    """
+    Cached per-session chat state (chat mode, escalation status).
+    Lets the user-chat WebSocket skip Postgres on most messages; the DB is
+    only read on a cache miss. Backed by Redis when configured, otherwise
+    by an in-process TTL cache.
+    """
+
+    # How long a cached value is trusted before re-reading the database
+    CACHE_TTL_SECONDS = 60
+
+    # Cached marker for "no escalation exists for this session"
+    NO_ESCALATION = "none"
+
+    # Local fallback: key -> (expires_at, value)
+    _local_cache: Dict[str, Tuple[float, str]] = {}
+    _LOCAL_CACHE_MAX_SIZE = 10_000
+
+    @staticmethod
+    async def _get(key: str) -> Optional[str]:
+        """Read a cached value, or None on miss"""
+        if redis_client is not None:
+            try:
+                return await redis_client.get(key)
+            except Exception as e:
+                logger.error("Redis read failed for %s: %s", key, e)
+                return None
+
+        entry = SessionStateService._local_cache.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            SessionStateService._local_cache.pop(key, None)
+            return None
+        return value
+
+    @staticmethod
+    async def _set(key: str, value: str):
+        """Write a cached value with the standard TTL"""
+        if redis_client is not None:
+            try:
+                await redis_client.set(key, value, ex=SessionStateService.CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.error("Redis write failed for %s: %s", key, e)
+            return
+
+        cache = SessionStateService._local_cache
+        now = time.monotonic()
+        if len(cache) >= SessionStateService._LOCAL_CACHE_MAX_SIZE:
+            for expired_key in [k for k, (expires_at, _) in cache.items() if expires_at < now]:
+                del cache[expired_key]
+        cache[key] = (now + SessionStateService.CACHE_TTL_SECONDS, value)
+
+    @staticmethod
+    async def get_chat_mode(db: AsyncSession, session_id: UUID) -> ChatMode:
+        """
+        Get the chat mode for a session.
+
+        Args:
+            db: Database session (used on cache miss)
+            session_id: Chat session UUID
+
+        Returns:
+            ChatMode of the linked appointment, BOT_ONLY if none exists
+        """
+        key = f"chat_mode:{session_id}"
+        cached = await SessionStateService._get(key)
+        if cached is not None:
+            return ChatMode(cached)
+
+        mode = await db.scalar(
+            select(Appointment.chat_mode).where(Appointment.session_id == session_id)
+        ) or ChatMode.BOT_ONLY
+
+        await SessionStateService._set(key, mode.value)
+        return mode
+
+    @staticmethod
+    async def set_chat_mode(session_id: UUID, mode: ChatMode):
+        """
+        Record a chat mode change (call after committing it).
+
+        Args:
+            session_id: Chat session UUID
+            mode: New chat mode
+        """
+        await SessionStateService._set(f"chat_mode:{session_id}", mode.value)
+
+    @staticmethod
+    async def get_cached_escalation_status(session_id: UUID) -> Tuple[bool, Optional[EscalationDecision]]:
+        """
+        Look up the cached escalation status for a session without touching the DB.
+        On a miss the caller loads it (see chat_service.fetch_turn_context)
+        and stores it with set_escalation_status.
+
+        Args:
+            session_id: Chat session UUID
+
+        Returns:
+            Tuple of (cache hit, user's answer or None if no escalation exists)
+        """
+        cached = await SessionStateService._get(f"escalation:{session_id}")
+        if cached is None:
+            return False, None
+        if cached == SessionStateService.NO_ESCALATION:
+            return True, None
+        return True, EscalationDecision(cached)
+
+    @staticmethod
+    async def set_escalation_status(session_id: UUID, status: Optional[EscalationDecision]):
+        """
+        Record an escalation status (call after committing any change to it).
+
+        Args:
+            session_id: Chat session UUID
+            status: Current user answer, or None if no escalation exists
+        """
+        value = status.value if status else SessionStateService.NO_ESCALATION
+        await SessionStateService._set(f"escalation:{session_id}", value)
+
+session_state_service = SessionStateService()
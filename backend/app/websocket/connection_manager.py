@@ -1,128 +1,186 @@
-from typing import Dict, Optional
+import asyncio
+import sys
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple
+from uuid import uuid4
 from fastapi import WebSocket
 from app.core.logging import logger
+from app.core.redis_client import redis_client
+from app.core.serialization import dumps
+from app.websocket.frame_writer import FrameWriter
+
+
+# Per-session Redis channel; every worker with a local socket for the session subscribes
+CHANNEL_PREFIX = "neurosupport:chat:"
+
+# Socket kinds a session can have; broadcasts may be limited to one of them
+USER_CHAT = "user-chat"
+HUMAN_CHAT = "human-chat"
 
 
 class ConnectionManager:
     """
-    NUCLEAR FIX: Manages WebSocket connections with hard therapist detection.
-    If therapist socket exists → AI code path is UNREACHABLE.
+    Registry of the live chat sockets of each session on this worker.
+    Frames are queued on each socket's FrameWriter, so a slow client never
+    holds up the sender or the other participants.
+    
+    With Redis configured, broadcasts are also published on a per-session
+    channel and every other worker forwards them to its own sockets, so
+    participants of one session may be connected to different uvicorn workers.
     """
     
+    # Messages kept per session for the chat health check
+    HISTORY_WINDOW = 10
+    
     def __init__(self):
-        # session_id -> {"user": WebSocket, "therapist": WebSocket}
-        self.sessions: Dict[str, Dict[str, WebSocket]] = {}
+        # session_id -> {websocket: (USER_CHAT | HUMAN_CHAT, its writer)}
+        self.sessions: Dict[str, Dict[WebSocket, Tuple[str, FrameWriter]]] = {}
+        
+        # Redis Pub/Sub subscription shared by all sessions of this worker
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        # Tags this worker's own publications (set on first use, i.e. after any fork)
+        self._origin: Optional[str] = None
+        
+        # Session channels currently subscribed; changed only under the lock,
+        # so a subscribe and an unsubscribe of one session cannot cross
+        self._subscribed: Set[str] = set()
+        self._subscription_lock = asyncio.Lock()
+        
+        # Fire-and-forget work (unsubscribes, closing dropped sockets), kept
+        # referenced until done and awaited on shutdown
+        self._background: Set[asyncio.Task] = set()
+        
+        # session_id -> (lock, number of user-chat sockets using it)
+        self._turn_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        
+        # session_id -> last HISTORY_WINDOW messages, shared by the session's
+        # user-chat sockets and dropped with its turn lock
+        self._history_windows: Dict[str, Deque] = {}
+        
+        # Encoded /active-sessions response; rebuilt only after a session
+        # appears or goes away, so dashboard polling costs nothing
+        self._active_sessions_body: Optional[str] = None
     
-    async def connect(self, session_id: str, role: str, websocket: WebSocket):
+    async def connect(self, session_id: str, kind: str, websocket: WebSocket, writer: FrameWriter):
         """
-        Connect a websocket with role.
+        Register an accepted websocket so session broadcasts reach it.
+        Every call must be paired with disconnect.
         
         Args:
             session_id: Chat session identifier
-            role: "user" or "therapist"
-            websocket: WebSocket connection
+            kind: USER_CHAT or HUMAN_CHAT
+            websocket: Accepted WebSocket connection
+            writer: The connection's outbound writer
         """
-        await websocket.accept()
+        # Interned so every later lookup of this key hits the identity fast path
+        session_id = sys.intern(session_id)
+        
+        # Registered before any await: a disconnect in the meantime can no
+        # longer empty and drop the session this socket is joining
+        connections = self.sessions.get(session_id)
+        if connections is None:
+            connections = self.sessions[session_id] = {}
+            self._active_sessions_body = None
+        connections[websocket] = (kind, writer)
         
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {}
+        if redis_client is not None:
+            await self._sync_subscription(session_id)
         
-        self.sessions[session_id][role] = websocket
-        logger.warning(f"🔌 WebSocket connected to session {session_id} as '{role}'. Active roles: {list(self.sessions[session_id].keys())}")
+        logger.info("🔌 WebSocket connected to session %s (%s). Connections: %d", session_id, kind, len(connections))
     
-    def disconnect(self, session_id: str, role: str):
+    def disconnect(self, session_id: str, websocket: WebSocket):
         """
-        Disconnect a role from a session.
+        Unregister a websocket from a session.
         
         Args:
             session_id: Chat session identifier
-            role: Role to disconnect
+            websocket: Connection to remove
         """
-        if session_id in self.sessions:
-            removed = self.sessions[session_id].pop(role, None)
-            if removed:
-                logger.warning(f"🔌 WebSocket disconnected from session {session_id} (role: {role})")
-            
-            # Clean up empty sessions
-            if len(self.sessions[session_id]) == 0:
-                del self.sessions[session_id]
+        connections = self.sessions.get(session_id)
+        if connections is None or connections.pop(websocket, None) is None:
+            return
+        logger.info("🔌 WebSocket disconnected from session %s", session_id)
+        
+        # Clean up empty sessions
+        if not connections:
+            del self.sessions[session_id]
+            self._active_sessions_body = None
+            if redis_client is not None:
+                self._run_in_background(self._sync_subscription(session_id))
     
-    def has_therapist(self, session_id: str) -> bool:
+    def acquire_turn_lock(self, session_id: str) -> asyncio.Lock:
         """
-        🚨 NUCLEAR CHECK: Does this session have a therapist connected?
-        
-        This is the SINGLE SOURCE OF TRUTH for bot disabling.
-        If this returns True, AI code path is UNREACHABLE.
+        Get the lock that serializes bot turns of a session on this worker.
+        Two tabs of the same session would otherwise run overlapping AI
+        turns (duplicate model calls, racing escalation writes).
+        Every call must be paired with release_turn_lock.
         
         Args:
             session_id: Session identifier
             
         Returns:
-            True if therapist socket exists, False otherwise
+            Lock shared by all user-chat sockets of the session
         """
-        return (
-            session_id in self.sessions and
-            "therapist" in self.sessions[session_id]
-        )
+        lock, users = self._turn_locks.get(session_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._turn_locks[session_id] = (lock, users + 1)
+        return lock
     
-    def get_role(self, websocket: WebSocket, session_id: str) -> Optional[str]:
+    def release_turn_lock(self, session_id: str):
         """
-        Get the role for a specific websocket connection.
+        Drop one socket's reference to the session's turn lock.
+        
+        Args:
+            session_id: Session identifier
+        """
+        lock, users = self._turn_locks.get(session_id, (None, 0))
+        if users <= 1:
+            self._turn_locks.pop(session_id, None)
+            self._history_windows.pop(session_id, None)
+        else:
+            self._turn_locks[session_id] = (lock, users - 1)
+    
+    def get_history_window(self, session_id: str) -> Optional[Deque]:
+        """
+        Get the session's in-memory window of recent messages.
+        Only read or modified while holding the session's turn lock.
         
         Args:
-            websocket: WebSocket connection
             session_id: Session identifier
             
         Returns:
-            Role ("user" or "therapist") or None if not found
+            Window (oldest first), or None if not seeded yet
         """
-        if session_id in self.sessions:
-            for role, ws in self.sessions[session_id].items():
-                if ws == websocket:
-                    return role
-        return None
+        return self._history_windows.get(session_id)
     
-    async def send_to_role(self, session_id: str, role: str, message: dict):
+    def seed_history_window(self, session_id: str, messages: Iterable) -> Deque:
         """
-        Send a message to a specific role in a session.
+        (Re)build the session's window of recent messages from the database.
         
         Args:
             session_id: Session identifier
-            role: Target role ("user" or "therapist")
-            message: Message data (will be JSON serialized)
+            messages: Recent messages, oldest first
+            
+        Returns:
+            The new window
         """
-        if session_id in self.sessions and role in self.sessions[session_id]:
-            try:
-                await self.sessions[session_id][role].send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending to {role} in session {session_id}: {e}")
-                self.disconnect(session_id, role)
+        window = deque(messages, maxlen=self.HISTORY_WINDOW)
+        self._history_windows[session_id] = window
+        return window
     
-    async def send_to_other(self, session_id: str, sender_role: str, message: dict):
+    def user_chat_count(self, session_id: str) -> int:
         """
-        Send a message to all OTHER roles in a session (not the sender).
+        Number of user-chat sockets of a session on this worker.
         
         Args:
             session_id: Session identifier
-            sender_role: Role of the sender (will be excluded)
-            message: Message data (will be JSON serialized)
+            
+        Returns:
+            Sockets currently holding the session's turn lock reference
         """
-        if session_id not in self.sessions:
-            logger.warning(f"No active connections for session {session_id}")
-            return
-        
-        disconnected = []
-        for role, ws in self.sessions[session_id].items():
-            if role != sender_role:
-                try:
-                    await ws.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending to {role} in session {session_id}: {e}")
-                    disconnected.append(role)
-        
-        # Clean up disconnected
-        for role in disconnected:
-            self.disconnect(session_id, role)
+        return self._turn_locks.get(session_id, (None, 0))[1]
     
     async def broadcast_to_session(self, message: dict, session_id: str):
         """
@@ -132,37 +190,156 @@ class ConnectionManager:
             message: Message data (will be JSON serialized)
             session_id: Target session identifier
         """
-        if session_id not in self.sessions:
-            logger.warning(f"No active connections for session {session_id}")
+        await self.broadcast_payload(session_id, dumps(message))
+    
+    async def broadcast_payload(
+        self,
+        session_id: str,
+        payload: str,
+        kind: Optional[str] = None,
+        exclude: Optional[WebSocket] = None
+    ):
+        """
+        Send pre-serialized JSON text to the connections of a session,
+        on this worker and (with Redis) on every other one.
+        
+        Args:
+            session_id: Target session identifier
+            payload: JSON text, serialized once for all recipients
+            kind: Only reach sockets of this kind (None = all)
+            exclude: Local socket that should not receive the frame (the sender)
+        """
+        self._deliver(session_id, payload, kind, exclude)
+        if redis_client is not None:
+            await self._publish(session_id, payload, kind)
+    
+    def _deliver(self, session_id: str, payload: str, kind: Optional[str], exclude: Optional[WebSocket] = None):
+        """
+        Queue a frame on this worker's sockets of a session.
+        A socket whose writer failed or is too far behind is dropped and closed;
+        its own handler then finishes.
+        """
+        connections = self.sessions.get(session_id)
+        if not connections:
             return
         
-        disconnected = []
-        for role, ws in self.sessions[session_id].items():
+        # Snapshot: a failing socket is removed while the frame is queued
+        for ws, (ws_kind, writer) in list(connections.items()):
+            if ws is exclude or (kind is not None and ws_kind != kind):
+                continue
             try:
-                await ws.send_json(message)
+                writer.send(payload)
             except Exception as e:
-                logger.error(f"Error broadcasting to {role} in session {session_id}: {e}")
-                disconnected.append(role)
+                logger.warning("Dropping connection in session %s: %r", session_id, e)
+                self.disconnect(session_id, ws)
+                self._run_in_background(self._close_quietly(ws))
+    
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        """Close a socket that may already be gone"""
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+    
+    def _run_in_background(self, coro):
+        """Start a task that is kept referenced until it finishes"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    def _origin_id(self) -> str:
+        """Id of this worker in published frames"""
+        if self._origin is None:
+            self._origin = uuid4().hex
+        return self._origin
+    
+    async def _publish(self, session_id: str, payload: str, kind: Optional[str]):
+        """
+        Publish a frame to the other workers holding sockets for the session.
         
-        # Clean up disconnected
-        for role in disconnected:
-            self.disconnect(session_id, role)
+        Args:
+            session_id: Session identifier
+            payload: JSON text, serialized once for all recipients
+            kind: Socket kind the frame is for (None = all)
+        """
+        try:
+            # "<origin>\n<kind>\n<payload>" - neither field contains a newline
+            await redis_client.publish(
+                CHANNEL_PREFIX + session_id,
+                f"{self._origin_id()}\n{kind or ''}\n{payload}"
+            )
+        except Exception as e:
+            logger.error("Redis publish failed for session %s: %s", session_id, e)
     
-    async def send_typing_indicator(self, session_id: str, sender_role: str, is_typing: bool):
+    async def _sync_subscription(self, session_id: str):
         """
-        Send typing indicator to OTHER participants in session.
+        Subscribe this worker to a session channel while it has local sockets
+        for the session, and unsubscribe once it has none, starting the
+        listener if needed. Connects and disconnects may call this in any
+        order; each call applies the current state.
         
         Args:
-            session_id: Target session
-            sender_role: Who is typing ("user" or "therapist")
-            is_typing: Whether typing started or stopped
+            session_id: Session identifier
         """
-        message = {
-            "type": "typing",
-            "sender": sender_role,
-            "is_typing": is_typing
-        }
-        await self.send_to_other(session_id, sender_role, message)
+        async with self._subscription_lock:
+            active = session_id in self.sessions
+            if active == (session_id in self._subscribed):
+                return
+            
+            try:
+                if self._pubsub is None:
+                    self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                
+                if active:
+                    await self._pubsub.subscribe(CHANNEL_PREFIX + session_id)
+                    self._subscribed.add(session_id)
+                    if self._listener is None or self._listener.done():
+                        self._listener = asyncio.create_task(self._listen())
+                else:
+                    self._subscribed.discard(session_id)
+                    await self._pubsub.unsubscribe(CHANNEL_PREFIX + session_id)
+            except Exception as e:
+                logger.error("Redis subscription update failed for session %s: %s", session_id, e)
+    
+    async def _listen(self):
+        """Forward frames published by other workers to this worker's sockets"""
+        origin = self._origin_id()
+        try:
+            async for message in self._pubsub.listen():
+                if message is None or message["type"] != "message":
+                    continue
+                
+                sender, kind, payload = message["data"].split("\n", 2)
+                if sender == origin:
+                    # Already delivered locally when it was published
+                    continue
+                
+                # Only queues on the sockets' writers, so no peer can stall the listener
+                session_id = message["channel"][len(CHANNEL_PREFIX):]
+                self._deliver(session_id, payload, kind or None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Redis Pub/Sub listener stopped: %s", e)
+    
+    async def close(self):
+        """Stop the Pub/Sub listener and release its Redis connection (shutdown)"""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+            self._subscribed.clear()
     
     def get_active_sessions(self) -> list:
         """
@@ -173,6 +350,21 @@ class ConnectionManager:
         """
         return list(self.sessions.keys())
     
+    def active_sessions_body(self) -> str:
+        """
+        Get the active sessions as an encoded JSON response body.
+        
+        Returns:
+            {"active_sessions": [...], "count": n} as JSON text
+        """
+        if self._active_sessions_body is None:
+            active_sessions = self.get_active_sessions()
+            self._active_sessions_body = dumps({
+                "active_sessions": active_sessions,
+                "count": len(active_sessions)
+            })
+        return self._active_sessions_body
+    
     def get_connection_count(self, session_id: str) -> int:
         """
         Get number of active connections for a session.
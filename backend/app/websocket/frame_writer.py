@@ -0,0 +1,82 @@
+import asyncio
+from typing import List, Optional
+from fastapi import WebSocket
+from app.core.serialization import send_batch
+
+
+class FrameWriter:
+    """
+    Outbound queue for one WebSocket, drained by a single writer task.
+
+    Handlers queue pre-serialized frames without awaiting the socket; frames
+    that pile up while a send is in flight (e.g. streamed AI chunks) leave
+    together as one {"type": "batch"} frame. Order is preserved.
+    """
+
+    def __init__(self, websocket: WebSocket, max_pending: int = 0, coalesce: bool = True):
+        """
+        Args:
+            websocket: Accepted WebSocket to write to
+            max_pending: Frames that may wait for the socket before send()
+                raises asyncio.QueueFull (0: unbounded)
+            coalesce: Merge frames queued during a send into one batch frame
+                (only for clients that unwrap {"type": "batch"})
+        """
+        self._websocket = websocket
+        self._coalesce = coalesce
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(max_pending)
+        self._error: Optional[BaseException] = None
+        self._task = asyncio.create_task(self._drain())
+
+    def send(self, *frames: str):
+        """
+        Queue frames for sending.
+
+        Args:
+            frames: JSON text frames (from dumps or pre-built constants)
+
+        Raises:
+            The error that stopped the writer, if the connection already failed;
+            asyncio.QueueFull if the socket is max_pending frames behind
+        """
+        if self._error is not None:
+            raise self._error
+        for frame in frames:
+            self._queue.put_nowait(frame)
+
+    async def _drain(self):
+        """Send queued frames, coalescing everything queued since the last send (if enabled)"""
+        while True:
+            frames: List[Optional[str]] = [await self._queue.get()]
+            while self._coalesce and not self._queue.empty():
+                frames.append(self._queue.get_nowait())
+
+            # None marks close(); everything queued before it is still sent
+            closing = frames[-1] is None
+            if closing:
+                frames.pop()
+
+            try:
+                if len(frames) == 1:
+                    await self._websocket.send_text(frames[0])
+                elif frames:
+                    await send_batch(self._websocket, frames)
+            except Exception as e:
+                self._error = e
+                return
+
+            if closing:
+                return
+
+    async def close(self):
+        """Flush queued frames (best-effort) and stop the writer task"""
+        if not self._task.done():
+            if self._queue.full():
+                # The socket is not keeping up; nothing left is worth flushing
+                self._task.cancel()
+            else:
+                self._queue.put_nowait(None)
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
@@ -1,42 +1,80 @@
+import sys
+import time
 from fastapi import APIRouter, WebSocket
-from typing import Dict, List
-from datetime import datetime
-import uuid
+from typing import Optional
+from datetime import datetime, timezone
+from uuid6 import uuid7
+
+from app.core.logging import logger
+from app.core.serialization import dumps, iter_json
+from app.websocket.connection_manager import HUMAN_CHAT, manager
+from app.websocket.frame_writer import FrameWriter
 
 router = APIRouter()
 
-human_connections: Dict[str, List[WebSocket]] = {}
+# Typing frames are tiny and frequent; built once per (sender, is_typing)
+_TYPING_FRAMES = {
+    (sender, is_typing): dumps({"type": "typing", "sender": sender, "is_typing": is_typing})
+    for sender in ("user", "therapist")
+    for is_typing in (True, False)
+}
+
+# Identical typing events from a socket within this interval are not relayed again
+_TYPING_REPEAT_SECONDS = 0.3
+
+# Frames a socket may fall behind by before it is closed as too slow
+_MAX_PENDING_FRAMES = 64
+
 
 @router.websocket("/ws/human-chat/{session_id}")
 async def human_chat(websocket: WebSocket, session_id: str):
     await websocket.accept()
-    print(f"🧑‍⚕️ Human chat connection accepted for session {session_id}")
+    logger.info("🧑‍⚕️ Human chat connection accepted for session %s", session_id)
 
-    human_connections.setdefault(session_id, []).append(websocket)
+    # The therapist client reads one event per frame, so no batch envelopes here
+    writer = FrameWriter(websocket, _MAX_PENDING_FRAMES, coalesce=False)
+    # Registered with the manager so frames reach participants on other workers too
+    session_id = sys.intern(session_id)
+    await manager.connect(session_id, HUMAN_CHAT, websocket, writer)
+    
+    # Last typing frame relayed from this socket, and when
+    last_typing_frame: Optional[str] = None
+    last_typing_at = 0.0
 
     try:
-        while True:
-            data = await websocket.receive_json()
-            print(f"📨 Human chat message received: {data}")
+        async for data in iter_json(websocket):
+            # Typing indicators are the most frequent frame: relay to the others and move on
+            if data.get("type") == "typing":
+                frame = _TYPING_FRAMES.get((data.get("sender"), bool(data.get("is_typing"))))
+                # One event per keystroke: forward state changes, and repeats
+                # only every _TYPING_REPEAT_SECONDS
+                now = time.monotonic()
+                if frame is not None and (frame is not last_typing_frame or now - last_typing_at >= _TYPING_REPEAT_SECONDS):
+                    last_typing_frame, last_typing_at = frame, now
+                    await manager.broadcast_payload(session_id, frame, HUMAN_CHAT, exclude=websocket)
+                continue
+
+            logger.debug("📨 Human chat message received: %s", data)
 
             message = {
                 "type": "message",
-                "id": str(uuid.uuid4()),
+                "id": uuid7(),
                 "session_id": session_id,
                 "sender": data["sender"],  # user | therapist
                 "content": data["content"],
                 "emotion": None,
                 "confidence": None,
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": datetime.now(timezone.utc)
             }
 
-            # 🚨 ONLY BROADCAST — NO AI
-            for ws in human_connections[session_id]:
-                await ws.send_json(message)
+            # 🚨 ONLY BROADCAST — NO AI (serialized once for all connections)
+            await manager.broadcast_payload(session_id, dumps(message), HUMAN_CHAT)
             
-            print(f"✅ Human chat message broadcasted to {len(human_connections[session_id])} connections")
+            logger.debug("✅ Human chat message broadcast to session %s", session_id)
 
     except Exception as e:
-        print(f"❌ Human chat error: {e}")
-        if session_id in human_connections:
-            human_connections[session_id].remove(websocket)
+        logger.error("❌ Human chat error: %s", e)
+
+    finally:
+        manager.disconnect(session_id, websocket)
+        await writer.close()
@@ -12,6 +12,7 @@ export function useWebSocket(sessionId: string | null, mode: 'bot' | 'human' = '
     setWebSocket,
     setConnected,
     addMessage,
+    appendMessageChunk,
     setTherapistTyping,
     setAiTyping,
   } = useChatStore()
@@ -34,11 +35,13 @@ export function useWebSocket(sessionId: string | null, mode: 'bot' | 'human' = '
       wsRef.current = ws
     }
 
-    ws.onmessage = (event) => {
-      const data = JSON.parse(event.data)
+    const handleEvent = (data: any) => {
       console.log('📥 WebSocket message received:', data.type, data)
 
-      if (data.type === 'message') {
+      if (data.type === 'batch') {
+        // Several events coalesced into one frame, in order
+        data.events.forEach(handleEvent)
+      } else if (data.type === 'message') {
         // New message received
         const message: ChatMessage = {
           id: data.id,
@@ -47,10 +50,23 @@ export function useWebSocket(sessionId: string | null, mode: 'bot' | 'human' = '
           content: data.content,
           emotion: data.emotion,
           confidence: data.confidence,
-          is_read: 'false',
+          is_read: false,
           created_at: data.created_at,
         }
         addMessage(message)
+      } else if (data.type === 'message_chunk') {
+        // Partial AI reply; the final 'message' frame with the same id replaces it,
+        // and a 'discard' chunk removes it (reply withdrawn for an escalation)
+        appendMessageChunk({
+          id: data.id,
+          session_id: data.session_id,
+          sender_type: data.sender,
+          content: data.content,
+          emotion: null,
+          confidence: null,
+          is_read: false,
+          created_at: new Date().toISOString(),
+        }, data.discard === true)
       } else if (data.type === 'typing') {
         // Typing indicator
         const sender = data.sender || data.sender_type
@@ -91,7 +107,7 @@ export function useWebSocket(sessionId: string | null, mode: 'bot' | 'human' = '
           content: data.message,
           emotion: null,
           confidence: null,
-          is_read: 'false',
+          is_read: false,
           created_at: data.timestamp || new Date().toISOString(),
         }
         addMessage(systemMessage)
@@ -108,6 +124,10 @@ export function useWebSocket(sessionId: string | null, mode: 'bot' | 'human' = '
       }
     }
 
+    ws.onmessage = (event) => {
+      handleEvent(JSON.parse(event.data))
+    }
+
     ws.onerror = (error) => {
       console.error('WebSocket error:', error)
     }
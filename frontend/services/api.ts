@@ -35,7 +35,7 @@ export interface ChatMessage {
   content: string
   emotion?: string
   confidence?: number
-  is_read: string
+  is_read: boolean
   created_at: string
 }
 
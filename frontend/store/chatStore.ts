@@ -21,6 +21,7 @@ interface ChatState {
   // Actions
   setSession: (sessionId: string, visitorId: string, visitorName?: string) => void
   addMessage: (message: ChatMessage) => void
+  appendMessageChunk: (chunk: ChatMessage, discard?: boolean) => void
   setMessages: (messages: ChatMessage[]) => void
   setWebSocket: (ws: WebSocket | null) => void
   setConnected: (connected: boolean) => void
@@ -44,8 +45,20 @@ export const useChatStore = create<ChatState>((set) => ({
   setSession: (sessionId, visitorId, visitorName) => 
     set({ sessionId, visitorId, visitorName }),
   
+  // Replaces a message with the same id (e.g. a streamed AI reply once stored)
   addMessage: (message) => 
-    set((state) => ({ messages: [...state.messages, message] })),
+    set((state) => state.messages.some((m) => m.id === message.id)
+      ? { messages: state.messages.map((m) => (m.id === message.id ? message : m)) }
+      : { messages: [...state.messages, message] }),
+  
+  // Streams text into the message with the chunk's id, creating it on the first chunk;
+  // a discard chunk removes the partial message (the reply was withdrawn)
+  appendMessageChunk: (chunk, discard = false) => 
+    set((state) => discard
+      ? { messages: state.messages.filter((m) => m.id !== chunk.id) }
+      : state.messages.some((m) => m.id === chunk.id)
+      ? { messages: state.messages.map((m) => (m.id === chunk.id ? { ...m, content: m.content + chunk.content } : m)) }
+      : { messages: [...state.messages, chunk] }),
   
   setMessages: (messages) => 
     set({ messages }),